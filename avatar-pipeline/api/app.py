@@ -1,11 +1,13 @@
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import uuid, json
+import os, uuid, json
 import redis
 
 app = FastAPI(title="Avatar Render API")
 r = redis.Redis(host="localhost", port=6379, db=0, decode_responses=True)
+# Narrações longas são sintetizadas em modo longo pelo serviço TTS.
+MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "20000"))
 
 class RenderRequest(BaseModel):
     text: str
@@ -21,8 +23,8 @@ class RenderRequest(BaseModel):
 def create_render(req: RenderRequest):
     if not req.language.lower().startswith("pt"):
         raise HTTPException(status_code=400, detail="Somente pt-BR nesta fase.")
-    if len(req.text) == 0 or len(req.text) > 800:
-        raise HTTPException(status_code=400, detail="Texto vazio ou > 800 caracteres.")
+    if len(req.text) == 0 or len(req.text) > MAX_TEXT_CHARS:
+        raise HTTPException(status_code=400, detail=f"Texto vazio ou > {MAX_TEXT_CHARS} caracteres.")
     job_id = str(uuid.uuid4())
     job = {
         "job_id": job_id,
@@ -0,0 +1 @@
+# Raiz do avatar-pipeline no sys.path: os testes importam services.* como os serviços.
@@ -0,0 +1,6 @@
+#!/usr/bin/env bash
+set -e
+curl -s -N -X POST http://localhost:8001/internal/tts/stream \
+ -H "Content-Type: application/json" \
+ -d '{"text":"Olá! Este é um teste de streaming. Cada frase chega assim que fica pronta.","language":"pt-BR"}' \
+ | jq -c '{type, index, offset_ms, duration_ms, words: (.words // [] | length)}'
@@ -0,0 +1,9 @@
+#!/usr/bin/env bash
+set -e
+curl -s -X POST http://localhost:8001/internal/tts/batch \
+ -H "Content-Type: application/json" \
+ -d '{"items":[
+   {"text":"Bem-vindo ao treinamento da NR-10.","language":"pt-BR"},
+   {"text":"Use sempre o EPI adequado. Bem-vindo ao treinamento da NR-10.","language":"pt-BR"},
+   {"text":"","language":"pt-BR"}
+ ]}' | jq '{cache_hits, synthesized_sentences, items: [.items[] | {index, status, error}]}'
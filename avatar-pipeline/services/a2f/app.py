@@ -1,49 +1,124 @@
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from pathlib import Path
-import time, json
+import hashlib, json, re, wave
+from services.a2f.cache import CurveCache, atomic_write, curve_key, file_sha1
+from services.a2f.dsp import ALGO_VERSION, audio_curves, curves_document, read_wav
+from services.a2f.visemes import TIMING_ALGO_VERSION, phoneme_segments, timing_curves, word_segments
 
-app = FastAPI(title="Audio2Face Wrapper (Placeholder)")
+app = FastAPI(title="Audio2Face Wrapper (DSP)")
 DATA_DIR = Path("/data")
 OUT_DIR = DATA_DIR / "a2f_out"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
+curve_cache = CurveCache(OUT_DIR)
+_SHA1_RE = re.compile(r"^[0-9a-f]{40}$")
+
+class PhonemeTiming(BaseModel):
+    p: str
+    start_ms: float = Field(ge=0)
+    end_ms: float = Field(ge=0)
+
+class WordTiming(BaseModel):
+    word: str
+    start_ms: float = Field(ge=0)
+    end_ms: float = Field(ge=0)
 
 class A2FRequest(BaseModel):
     wav_path: str
     format: str = "json"
+    fps: int = 30  # mesmo fps do render
+    # Timings do TTS: com eles o áudio não é analisado. Tipados para que entrada
+    # malformada volte 422 na validação, e não erro no cálculo.
+    phonemes: list[PhonemeTiming] | None = None
+    words: list[WordTiming] | None = None
+    duration_ms: int | None = None
 
 class A2FResponse(BaseModel):
     curves_path: str
     format: str
     arkit_map: bool = True
+    fps: int = 30
+    frames: int = 0
+    source: str = "audio"  # "timings" | "audio"
+    cache_hit: bool = False
+    key: str = ""
 
-@app.post("/internal/a2f", response_model=A2FResponse)
-def a2f(req: A2FRequest):
-    wav = Path(req.wav_path)
-    if not wav.exists():
-        raise HTTPException(status_code=400, detail="wav_path inexistente.")
-    out_file = OUT_DIR / f"curves_{int(time.time())}.{req.format}"
-    sample = {
-        "rig": "arkit",
-        "curves": {
-            "jawOpen": [
-                {"t_ms": 0, "w": 0.0},
-                {"t_ms": 200, "w": 0.6},
-                {"t_ms": 400, "w": 0.1}
-            ],
-            "mouthClose": [
-                {"t_ms": 100, "w": 0.2},
-                {"t_ms": 300, "w": 0.7}
-            ]
-        }
-    }
-    if req.format == "json":
-        out_file.write_text(json.dumps(sample))
+def write_curves(out_file: Path, doc: dict, fmt: str):
+    if fmt == "json":
+        out_file.write_text(json.dumps(doc))
     else:
         lines = ["curve,t_ms,w"]
-        for name, pts in sample["curves"].items():
+        for name, pts in doc["curves"].items():
             for p in pts:
                 lines.append(f"{name},{p['t_ms']},{p['w']}")
         out_file.write_text("\n".join(lines))
-    return A2FResponse(curves_path=str(out_file), format=req.format, arkit_map=True)
+
+def timeline_duration_ms(req: A2FRequest, wav: Path, segment_end: float) -> float:
+    # Duração do áudio pelo pedido ou pelo sidecar do TTS (<hash>.json), sem abrir o WAV.
+    if req.duration_ms:
+        return req.duration_ms
+    try:
+        return json.loads(wav.with_suffix(".json").read_text())["audio"]["duration_ms"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return segment_end
+
+def compute_curves(req: A2FRequest, wav: Path) -> tuple:
+    # Caminho rápido pelos timings (fonemas, senão palavras); análise do áudio só sem eles.
+    segments = (phoneme_segments([p.model_dump() for p in req.phonemes]) if req.phonemes else None)
+    if (segments is None or not segments[0].size) and req.words:
+        segments = word_segments([w.model_dump() for w in req.words])
+    if segments is not None and segments[0].size:
+        duration = timeline_duration_ms(req, wav, float(segments[1].max()))
+        return timing_curves(*segments, duration, req.fps), "timings"
+    try:
+        x, sr = read_wav(wav)
+    except (wave.Error, KeyError, EOFError) as e:
+        raise HTTPException(status_code=400, detail=f"WAV PCM inválido: {e}")
+    return audio_curves(x, sr, req.fps), "audio"
+
+def source_id(wav: Path) -> str:
+    # SHA-1 do arquivo WAV. O TTS grava esse mesmo hash no sidecar (audio.sha1), então
+    # narrações do cache não precisam ser lidas; sem sidecar, o arquivo é lido.
+    try:
+        sha1 = json.loads(wav.with_suffix(".json").read_text())["audio"]["sha1"]
+    except (OSError, ValueError, KeyError, TypeError):
+        sha1 = None
+    return f"wav:{sha1 if isinstance(sha1, str) and _SHA1_RE.match(sha1) else file_sha1(wav)}"
+
+def request_curve_key(req: A2FRequest, wav: Path) -> str:
+    timed = bool(req.phonemes or req.words)
+    payload = {"source": source_id(wav), "format": req.format, "rig": "arkit", "fps": req.fps,
+               "mode": "timings" if timed else "audio",
+               "algo": TIMING_ALGO_VERSION if timed else ALGO_VERSION}
+    if timed:
+        # Os timings vêm no pedido e não são determinados pelo arquivo.
+        timings = json.dumps(req.model_dump(include={"phonemes", "words", "duration_ms"}), sort_keys=True)
+        payload["timings"] = hashlib.sha1(timings.encode("utf-8")).hexdigest()
+    return curve_key(payload)
+
+@app.post("/internal/a2f", response_model=A2FResponse)
+def a2f(req: A2FRequest):
+    wav = Path(req.wav_path)
+    if not wav.exists():
+        raise HTTPException(status_code=400, detail="wav_path inexistente.")
+    if req.format not in ("json", "csv") or not (1 <= req.fps <= 120):
+        raise HTTPException(status_code=400, detail="format deve ser json ou csv e fps entre 1 e 120.")
+    key = request_curve_key(req, wav)
+    hit = curve_cache.get(key)
+    if hit is not None:
+        path, meta = hit
+        return A2FResponse(curves_path=str(path), format=req.format, arkit_map=True, fps=req.fps,
+                           frames=meta["frames"], source=meta["source"], cache_hit=True, key=key)
+    curves, source = compute_curves(req, wav)
+    out_file = curve_cache.path(key, req.format)
+    # Escrita atômica: requisições simultâneas da mesma chave não corrompem o arquivo.
+    doc = curves_document(curves, req.fps)
+    atomic_write(out_file, lambda p: write_curves(p, doc, req.format))
+    curve_cache.add(key, out_file, {"frames": curves.shape[0], "source": source})
+    return A2FResponse(curves_path=str(out_file), format=req.format, arkit_map=True,
+                       fps=req.fps, frames=curves.shape[0], source=source, key=key)
+
+@app.get("/internal/a2f/cache/stats")
+def cache_stats():
+    return curve_cache.stats()
@@ -0,0 +1,75 @@
+
+# Cache de curvas endereçado por conteúdo: a chave combina a origem do áudio (SHA-1
+# do WAV), formato, rig, fps, versão do algoritmo e timings enviados. Arquivos
+# em <hash[:2]>/<hash>.<formato>, gravados de forma atômica, e índice em SQLite.
+import hashlib, json, os, sqlite3, threading, time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS curves (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+def atomic_write(path: Path, write):
+    # Temporário no mesmo diretório + rename: leitores nunca veem curva parcial.
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+def file_sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def curve_key(payload: dict) -> str:
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+class CurveCache:
+    def __init__(self, root: Path):
+        self.root = root
+        self.db_path = root / "index.sqlite3"
+        self._local = threading.local()
+        self._db().executescript(SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def path(self, key: str, fmt: str) -> Path:
+        d = self.root / key[:2]
+        d.mkdir(parents=True, exist_ok=True)
+        return d / f"{key}.{fmt}"
+
+    def get(self, key: str) -> tuple[Path, dict] | None:
+        db = self._db()
+        row = db.execute("SELECT path, meta FROM curves WHERE key=?", (key,)).fetchone()
+        if row is None or not Path(row[0]).exists():
+            return None
+        db.execute("UPDATE curves SET last_access=?, hits=hits+1 WHERE key=?", (time.time(), key))
+        return Path(row[0]), json.loads(row[1])
+
+    def add(self, key: str, path: Path, meta: dict):
+        now = time.time()
+        self._db().execute(
+            "INSERT INTO curves (key, path, meta, created, last_access) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET path=excluded.path, meta=excluded.meta, last_access=excluded.last_access",
+            (key, str(path), json.dumps(meta), now, now))
+
+    def stats(self) -> dict:
+        entries, hits = self._db().execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM curves").fetchone()
+        return {"entries": entries, "hits": hits}
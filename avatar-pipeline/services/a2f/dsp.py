@@ -0,0 +1,107 @@
+
+# Curvas ARKit a partir do áudio, em CPU e sem laços por amostra: o WAV é dividido
+# em quadros no fps do render (janelas com 50% de sobreposição), cada quadro vira
+# um vetor de features (RMS, centroide, energia por banda, cruzamentos por zero),
+# as features viram pesos de visemas e os visemas viram blendshapes por uma matriz.
+import wave
+import numpy as np
+
+ALGO_VERSION = 1
+
+# Classes de visema e a contribuição de cada uma para as blendshapes ARKit.
+VISEMES = ["sil", "aa", "ee", "oo", "ff", "ss", "mm"]
+ARKIT = ["jawOpen", "mouthClose", "mouthFunnel", "mouthPucker", "mouthStretchLeft",
+         "mouthStretchRight", "mouthSmileLeft", "mouthSmileRight", "mouthRollLower",
+         "mouthPressLeft", "mouthPressRight", "mouthLowerDownLeft", "mouthLowerDownRight"]
+VISEME_TO_ARKIT = np.array([
+    #  jaw  close funnel pucker strL strR smiL smiR rollL presL presR lowL lowR
+    [0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00],  # sil
+    [0.70, 0.00, 0.00, 0.00, 0.05, 0.05, 0.00, 0.00, 0.00, 0.00, 0.00, 0.35, 0.35],  # aa (a)
+    [0.30, 0.00, 0.00, 0.00, 0.45, 0.45, 0.25, 0.25, 0.00, 0.00, 0.00, 0.15, 0.15],  # ee (e, i)
+    [0.35, 0.00, 0.60, 0.55, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.05, 0.05],  # oo (o, u)
+    [0.10, 0.00, 0.00, 0.00, 0.10, 0.10, 0.00, 0.00, 0.65, 0.00, 0.00, 0.00, 0.00],  # ff (f, v)
+    [0.12, 0.00, 0.00, 0.00, 0.35, 0.35, 0.15, 0.15, 0.00, 0.00, 0.00, 0.10, 0.10],  # ss (s, z, x, ch)
+    [0.00, 0.60, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.45, 0.45, 0.00, 0.00],  # mm (m, b, p)
+], dtype=np.float32)
+
+def read_wav(path: str) -> tuple[np.ndarray, int]:
+    # PCM 8/16/24/32 bits pelo módulo wave da stdlib; mono (média dos canais), float32.
+    with wave.open(str(path), "rb") as w:
+        sr, width, channels = w.getframerate(), w.getsampwidth(), w.getnchannels()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        x = (b[:, 0].astype(np.int32) | b[:, 1].astype(np.int32) << 8 | b[:, 2].astype(np.int32) << 16)
+        x = np.where(x >= 1 << 23, x - (1 << 24), x).astype(np.float32) / (1 << 23)
+    else:
+        dtype = {2: np.int16, 4: np.int32}[width]
+        x = np.frombuffer(raw, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+    return x.reshape(-1, channels).mean(axis=1), sr
+
+def frame_features(x: np.ndarray, sr: int, fps: int) -> dict:
+    # Um quadro por frame de vídeo; janela Hann de 2 quadros centrada no instante.
+    hop = sr / fps
+    n = int(np.ceil(x.size / hop)) if x.size else 0
+    win = int(2 * hop)
+    n_fft = 1 << int(np.ceil(np.log2(max(win, 2))))
+    padded = np.pad(x, (win // 2, win))
+    starts = (np.arange(n) * hop).astype(np.int64)
+    frames = padded[starts[:, None] + np.arange(win)] * np.hanning(win).astype(np.float32)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    zcr = np.mean(np.abs(np.diff(np.signbit(frames), axis=1)), axis=1)
+    power = np.abs(np.fft.rfft(frames, n=n_fft, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(n_fft, 1 / sr)
+    total = power.sum(axis=1) + 1e-12
+    bands = {name: power[:, (freqs >= lo) & (freqs < hi)].sum(axis=1) / total
+             for name, (lo, hi) in {"low": (80, 500), "mid": (500, 2000), "high": (2000, 8000)}.items()}
+    centroid = (power @ freqs) / total
+    return {"rms": rms, "zcr": zcr, "centroid": centroid, **bands}
+
+def _smooth(w: np.ndarray, fps: int, forward_ms: float = 40, backward_ms: float = 90) -> np.ndarray:
+    # Média móvel exponencial aplicada nos dois sentidos (sem defasagem), via
+    # convolução com núcleo exponencial truncado: vetorizada no eixo do tempo.
+    out = w
+    for ms in (forward_ms, backward_ms):
+        a = np.exp(-1000 / (ms * fps))
+        k = a ** np.arange(max(1, int(5 * ms * fps / 1000)))
+        k /= k.sum()
+        out = np.apply_along_axis(lambda c: np.convolve(c, k, mode="full")[:c.size], 0, out)
+        out = out[::-1]
+    return out
+
+def viseme_weights(f: dict, fps: int) -> np.ndarray:
+    # (quadros, visemas), cada linha somando 1.
+    rms = f["rms"]
+    db = 20 * np.log10(rms + 1e-9)
+    ref = np.percentile(db, 95) if db.size else 0.0
+    loud = np.clip((db - (ref - 40)) / 40, 0, 1)              # 0 = silêncio, 1 = pico de fala
+    voiced = loud * np.clip(1.5 - 6 * f["zcr"], 0, 1)
+    unvoiced = loud * np.clip(f["high"] * 2 + f["zcr"] * 3 - 0.6, 0, 1)
+    w = np.stack([
+        np.clip(1 - 2 * loud, 0, 1),                          # sil
+        voiced * np.clip(f["mid"] * 1.6, 0, 1),               # aa: energia em F1/F2 médios
+        voiced * np.clip((f["centroid"] - 1200) / 1500, 0, 1),  # ee: F2 alto, espectro claro
+        voiced * np.clip(f["low"] * 1.8 - f["mid"], 0, 1),    # oo: energia concentrada no grave
+        unvoiced * np.clip(1 - f["high"] * 1.5, 0, 1),        # ff: fricativa de ruído mais largo
+        unvoiced * np.clip(f["high"] * 1.5, 0, 1),            # ss: sibilante, energia aguda
+        # mm: fala fraca e grave (nasais/oclusivas bilabiais), entre silêncio e vogal
+        loud * (1 - loud) * np.clip(f["low"] * 2 - f["high"] * 4, 0, 1),
+    ], axis=1)
+    w = _smooth(w, fps)
+    return w / (w.sum(axis=1, keepdims=True) + 1e-9)
+
+def audio_curves(x: np.ndarray, sr: int, fps: int = 30) -> np.ndarray:
+    # (quadros, blendshapes ARKit) em [0, 1].
+    f = frame_features(x, sr, fps)
+    if not f["rms"].size:
+        return np.zeros((0, len(ARKIT)), dtype=np.float32)
+    return np.clip(viseme_weights(f, fps) @ VISEME_TO_ARKIT, 0, 1).astype(np.float32)
+
+def curves_document(curves: np.ndarray, fps: int, rig: str = "arkit") -> dict:
+    # Mesmo formato das curvas anteriores: {"rig", "curves": {nome: [{"t_ms", "w"}]}}.
+    t_ms = np.round(np.arange(curves.shape[0]) * 1000 / fps).astype(int).tolist()
+    return {"rig": rig, "fps": fps, "algo_version": ALGO_VERSION, "curves": {
+        name: [{"t_ms": t, "w": w} for t, w in zip(t_ms, np.round(curves[:, i].astype(np.float64), 3).tolist())]
+        for i, name in enumerate(ARKIT)}}
@@ -0,0 +1,84 @@
+
+# Curvas ARKit a partir dos timings do TTS, sem análise de áudio: cada fonema (ou
+# letra, quando só há timings de palavra) tem um vetor de visemas numa tabela; a
+# linha do tempo é montada por searchsorted sobre os quadros e a coarticulação é
+# uma suavização temporal que preserva o fechamento dos lábios em m/b/p e f/v.
+import numpy as np
+from services.a2f.dsp import ARKIT, VISEME_TO_ARKIT, VISEMES, _smooth
+
+TIMING_ALGO_VERSION = 1
+
+def _v(**weights) -> np.ndarray:
+    row = np.zeros(len(VISEMES), dtype=np.float32)
+    for name, w in weights.items():
+        row[VISEMES.index(name)] = w
+    return row
+
+# Símbolos do fonemizador (IPA do espeak-ng pt-br) -> visema. Consoantes linguais e
+# velares não movem muito os lábios: mistura de boca entreaberta com repouso.
+_LINGUAL = _v(ee=0.4, aa=0.2, sil=0.4)
+PHONEME_VISEMES = {
+    **{p: _v(aa=1.0) for p in ("a", "ɐ", "ã", "ɑ", "æ")},
+    **{p: _v(aa=0.4, ee=0.6) for p in ("ɛ", "ə")},
+    **{p: _v(ee=1.0) for p in ("e", "i", "ɪ", "ẽ", "ĩ", "j", "y")},
+    **{p: _v(oo=0.6, aa=0.4) for p in ("ɔ",)},
+    **{p: _v(oo=1.0) for p in ("o", "u", "ʊ", "õ", "ũ", "w")},
+    **{p: _v(mm=1.0) for p in ("p", "b", "m")},
+    **{p: _v(ff=1.0) for p in ("f", "v")},
+    **{p: _v(ss=1.0) for p in ("s", "z", "ʃ", "ʒ", "ç")},
+    **{p: _LINGUAL for p in ("t", "d", "n", "l", "ɾ", "r", "ʁ", "x", "k", "g", "ɡ", "ɲ", "ʎ", "h", "ɣ", "ð", "θ", "ŋ")},
+}
+# Letras, para quando só há timings de palavra (ex.: motor de contingência).
+LETTER_VISEMES = {
+    **{c: _v(aa=1.0) for c in "aáàâã"}, **{c: _v(ee=1.0) for c in "eéêiíy"},
+    **{c: _v(oo=1.0) for c in "oóôõuúüw"}, **{c: _v(mm=1.0) for c in "mbp"},
+    **{c: _v(ff=1.0) for c in "fv"}, **{c: _v(ss=1.0) for c in "szxcçj"},
+    **{c: _LINGUAL for c in "tdnlrkgqh"},
+}
+SILENCE = _v(sil=1.0)
+# Visemas que exigem contato labial: a suavização não pode apagá-los.
+_CLOSURES = [VISEMES.index("mm"), VISEMES.index("ff")]
+
+def phoneme_segments(phonemes: list[dict]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # (inícios, fins, visemas) dos fonemas conhecidos; acentos, alongamento e
+    # diacríticos soltos não têm visema próprio e são descartados.
+    known = [(p["start_ms"], p["end_ms"], PHONEME_VISEMES[p["p"]]) for p in phonemes
+             if p.get("p") in PHONEME_VISEMES]
+    return _arrays(known)
+
+def word_segments(words: list[dict]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Divide o intervalo de cada palavra igualmente entre as letras com visema.
+    segs = []
+    for w in words:
+        letters = [LETTER_VISEMES[c] for c in w["word"].lower() if c in LETTER_VISEMES]
+        if not letters:
+            continue
+        edges = np.linspace(w["start_ms"], w["end_ms"], len(letters) + 1)
+        segs += zip(edges[:-1], edges[1:], letters)
+    return _arrays(segs)
+
+def _arrays(segs: list) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if not segs:
+        return np.zeros(0), np.zeros(0), np.zeros((0, len(VISEMES)), dtype=np.float32)
+    starts, ends, rows = zip(*segs)
+    return np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64), np.stack(rows)
+
+def timing_curves(starts: np.ndarray, ends: np.ndarray, rows: np.ndarray, duration_ms: float,
+                  fps: int = 30) -> np.ndarray:
+    # (quadros, blendshapes ARKit) em [0, 1], um quadro por frame de vídeo.
+    n = int(np.ceil(duration_ms * fps / 1000)) if duration_ms > 0 else 0
+    if not rows.size:
+        # Silêncio mapeia para todas as blendshapes em repouso.
+        return np.zeros((n, len(ARKIT)), dtype=np.float32)
+    t = np.arange(n) * 1000 / fps
+    order = np.argsort(starts, kind="stable")
+    starts, ends, rows = starts[order], ends[order], rows[order]
+    idx = np.clip(np.searchsorted(starts, t, side="right") - 1, 0, None)
+    active = (t >= starts[idx]) & (t < ends[idx])
+    target = np.where(active[:, None], rows[idx], SILENCE)
+    # Coarticulação: vizinhos se misturam pela suavização nos dois sentidos; o
+    # fechamento labial fica com o máximo entre o suavizado e 90% do alvo.
+    blended = _smooth(target, fps, forward_ms=35, backward_ms=60)
+    blended[:, _CLOSURES] = np.maximum(blended[:, _CLOSURES], 0.9 * target[:, _CLOSURES])
+    blended /= blended.sum(axis=1, keepdims=True) + 1e-9
+    return np.clip(blended @ VISEME_TO_ARKIT, 0, 1).astype(np.float32)
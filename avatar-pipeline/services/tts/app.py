@@ -1,57 +1,754 @@
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from pathlib import Path
-import hashlib, json, time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import base64, hashlib, io, json, math, os, re, socket, subprocess, threading, time
 import soundfile as sf
-from TTS.api import TTS
+from services.tts.audio import apply_voice, audio_stats, crossfade_concat, crossfade_offsets, to_pcm16
+from services.tts.backends import BACKENDS, load_model
+from services.tts.batching import AdmissionQueue, BatchScheduler
+from services.tts.cache import TIER_DIRS, AudioCache, HotTier, SingleFlight, atomic_write
+from services.tts.cluster import ClusterIndex
+from services.tts.engine import LocalEngine, ProcessEngine
+from services.tts.fallback import fallback_available, synth_fallback
+from services.tts.g2p import G2P_ENABLED, lexicon_hash, load_lexicon
+from services.tts.normalize import NORMALIZER_VERSION, normalize_text
+from services.tts.peaks import PEAKS_VERSION, decode_peaks, encode_peaks
+from services.tts.registry import ModelRegistry
+from services.tts.text import approx_word_timings, shift_timings, split_chunks
+from services.tts.variants import parse_variant, transcode
+from services.tts.warmup import WarmupJob, mine_redis
 
 app = FastAPI(title="TTS Local PT-BR")
 DATA_DIR = Path("/data")
 CACHE_DIR = DATA_DIR / "tts_cache"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
+# Dois níveis no mesmo índice: "full" (narração completa) e "sentence" (um clipe
+# por frase, reaproveitado entre narrações).
+CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+CACHE_FANOUT = int(os.getenv("TTS_CACHE_FANOUT", "2"))
+cache = AudioCache(CACHE_DIR, max_bytes=CACHE_MAX_BYTES, fanout=CACHE_FANOUT)
+if (adopted := cache.adopt_legacy()):
+    print(f"[tts] {adopted} entradas do layout antigo indexadas no cache")
+# Requisições idênticas em andamento esperam a primeira em vez de sintetizar de novo.
+flight = SingleFlight()
+# Índice compartilhado entre nós (Redis); vazio = cache somente local.
+CLUSTER_REDIS = os.getenv("TTS_CLUSTER_REDIS", "")
+NODE_ID = os.getenv("TTS_NODE_ID", socket.gethostname())
+NODE_URL = os.getenv("TTS_NODE_URL", f"http://{NODE_ID}:8001")
+cluster = ClusterIndex(CLUSTER_REDIS, NODE_ID, NODE_URL) if CLUSTER_REDIS else None
+if cluster is not None:
+    cache.on_add.append(cluster.publish)
+    cache.on_remove.append(cluster.unpublish)
+# Nível em memória para entradas acessadas repetidamente (saudações, transições):
+# metadados sempre, bytes do WAV só de clipes de frase até TTS_HOT_ITEM_MAX_BYTES.
+HOT_MAX_BYTES = int(os.getenv("TTS_HOT_MAX_BYTES", str(64 * 1024 ** 2)))
+HOT_ITEM_MAX_BYTES = int(os.getenv("TTS_HOT_ITEM_MAX_BYTES", str(512 * 1024)))
+hot = HotTier(HOT_MAX_BYTES, HOT_ITEM_MAX_BYTES, touch=cache.touch, created=cache.created)
+cache.on_remove.append(hot.discard)
 
 # Selecionar um modelo PT-BR estável do Coqui TTS (ajuste se necessário)
-# Se o modelo não suportar timestamps, retornaremos somente word-level aproximado.
-MODEL_NAME = "tts_models/pt/cv/vits"  # substituível por outro PT-BR suportado
+# Timings de palavra/fonema vêm das durações do VITS; em modelos sem elas,
+# retornaremos somente word-level aproximado.
+MODEL_NAME = os.getenv("TTS_MODEL_NAME", "tts_models/pt/cv/vits")  # substituível por outro PT-BR suportado
+# Vozes adicionais: {"voz": "tts_models/..."}; voz desconhecida usa MODEL_NAME.
+VOICE_MODELS = json.loads(os.getenv("TTS_VOICE_MODELS", "{}"))
+PRELOAD_MODELS = [m for m in os.getenv("TTS_PRELOAD_MODELS", MODEL_NAME).split(",") if m]
+MODEL_MEMORY_MB = int(os.getenv("TTS_MODEL_MEMORY_MB", "2048"))
+
+# Toda narração é dividida em frases/orações de até CHUNK_CHARS, sintetizadas em
+# paralelo (somente as que não estão no cache de frases) e costuradas com crossfade.
+MAX_LONG_TEXT_CHARS = int(os.getenv("TTS_MAX_LONG_TEXT_CHARS", "20000"))
+CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "250"))
+CROSSFADE_MS = int(os.getenv("TTS_CROSSFADE_MS", "30"))
+SYNTH_WORKERS = int(os.getenv("TTS_SYNTH_WORKERS", str(os.cpu_count() or 1)))
+# Micro-batching: frases que chegam dentro da janela viram um único lote no modelo.
+BATCH_WINDOW_MS = int(os.getenv("TTS_BATCH_WINDOW_MS", "20"))
+BATCH_MAX = int(os.getenv("TTS_BATCH_MAX", "8"))
+INFER_WORKERS = int(os.getenv("TTS_INFER_WORKERS", "2"))
+MAX_BATCH_ITEMS = int(os.getenv("TTS_MAX_BATCH_ITEMS", "200"))
+# TTS_INFER_PROCESSES > 0 tira a inferência do processo da API: cada processo do pool
+# fica com uma fatia dos núcleos (TTS_TORCH_THREADS, padrão = núcleos / processos).
+INFER_PROCESSES = int(os.getenv("TTS_INFER_PROCESSES", "0"))
+TORCH_THREADS = int(os.getenv("TTS_TORCH_THREADS", "0"))
+# Fila de admissão, em frases aceitas e ainda não sintetizadas; cheia => 429.
+MAX_QUEUE = int(os.getenv("TTS_MAX_QUEUE", "256"))
+# Contingência (espeak-ng) para requisições com enable_fallback: usada quando a espera
+# estimada na fila passa de TTS_FALLBACK_SLO_MS ou quando o motor principal falha.
+FALLBACK_SLO_MS = int(os.getenv("TTS_FALLBACK_SLO_MS", "3000"))
+FALLBACK_VOICE = os.getenv("TTS_FALLBACK_VOICE", "pt-br")
+# Léxico de pronúncias do cache de G2P (g2p.py): o hash dele entra nas chaves de áudio.
+LEXICON_HASH = lexicon_hash(load_lexicon()) if G2P_ENABLED else None
+# Backend de inferência em CPU: torch | torch-int8 | onnx | onnx-int8 (ver backends.py).
+BACKEND = os.getenv("TTS_BACKEND", "torch")
+if BACKEND not in BACKENDS:
+    raise RuntimeError(f"TTS_BACKEND inválido: {BACKEND} (opções: {', '.join(BACKENDS)})")
+# Envelope RMS do sidecar é amostrado no fps do render (um valor por quadro).
+RENDER_FPS = int(os.getenv("TTS_RENDER_FPS", "30"))
+
+if INFER_PROCESSES > 0:
+    engine = ProcessEngine(INFER_PROCESSES, TORCH_THREADS, MODEL_MEMORY_MB * 1024 * 1024, BACKEND)
+    INFER_WORKERS = INFER_PROCESSES
+else:
+    engine = LocalEngine(ModelRegistry(budget_bytes=MODEL_MEMORY_MB * 1024 * 1024,
+                                       loader=lambda name: load_model(name, BACKEND)),
+                         TORCH_THREADS or max(1, (os.cpu_count() or 1) // INFER_WORKERS), BACKEND)
+synth_pool = ThreadPoolExecutor(max_workers=SYNTH_WORKERS, thread_name_prefix="tts-synth")
+scheduler = BatchScheduler(engine.infer, window_ms=BATCH_WINDOW_MS, max_batch=BATCH_MAX,
+                           workers=INFER_WORKERS)
+admission = AdmissionQueue(MAX_QUEUE)
+cache_stats = Counter()
+_stats_lock = threading.Lock()
+
+def count(name: str, n: int = 1):
+    with _stats_lock:
+        cache_stats[name] += n
+
+@app.on_event("startup")
+def preload_models():
+    engine.start(PRELOAD_MODELS)
 
 class TTSRequest(BaseModel):
     text: str
     language: str = "pt-BR"
     voice: str | None = None
     speed: float = 1.0
-    pitch: float = 0.0
+    pitch: float = 0.0  # semitons
+    # Variante derivada pedida junto ("m4a", "opus", "mp3", "wav@16000"); não entra na chave.
+    variant: str | None = None
+    # Aceita o motor de contingência sob saturação ou falha do principal; não entra na chave.
+    enable_fallback: bool = False
+
+class TTSBatchRequest(BaseModel):
+    items: list[TTSRequest]
+
+class PurgeRequest(BaseModel):
+    tier: str | None = None
+    older_than_s: float | None = None
+
+class WarmupRequest(BaseModel):
+    phrases: list[str] = []
+    from_redis: bool = False  # soma as frases mais frequentes dos jobs no Redis
+    top: int = 200
+    min_count: int = 2
+    rate_per_s: float = 1.0
+    voice: str | None = None
 
 class TTSResponse(BaseModel):
     wav_path: str
     sample_rate: int
     words: list
+    normalized_text: str
+    phonemes: list = []
+    # duration_ms, samples, peak/rms (linear e dBFS), loudness_lufs e envelope RMS por quadro.
+    audio: dict = {}
+    variant_path: str | None = None
+    engine: str = "primary"  # "primary" | "fallback"
+
+class TTSBatchItem(BaseModel):
+    index: int
+    status: str  # "ok" | "error"
+    result: TTSResponse | None = None
+    error: str | None = None
+
+class TTSBatchResponse(BaseModel):
+    items: list[TTSBatchItem]
+    cache_hits: int
+    synthesized_sentences: int
 
 def make_hash(payload: dict) -> str:
     return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
 
-@app.post("/internal/tts", response_model=TTSResponse)
-def synth(req: TTSRequest):
+def resolve_model(voice: str | None) -> str:
+    return VOICE_MODELS.get(voice, MODEL_NAME) if voice else MODEL_NAME
+
+def queue_wait_s() -> float:
+    # Tempo estimado para a fila atual escoar, pelo custo médio por frase.
+    return admission.in_use * scheduler.item_s / max(1, INFER_WORKERS)
+
+def retry_after() -> int:
+    return max(1, math.ceil(queue_wait_s()))
+
+def pending_units(keys) -> int:
+    # Frases que de fato irão ao modelo: distintas e fora do cache. Só elas ocupam a
+    # fila; contar hits inflaria a profundidade e o Retry-After estimado.
+    return sum(1 for k in set(keys) if not cache.contains(k, "sentence"))
+
+def admit(units: int):
+    if units and not admission.try_acquire(units):
+        raise HTTPException(status_code=429, detail="Fila de síntese cheia; tente novamente.",
+                            headers={"Retry-After": str(retry_after())})
+
+def request_key(req: TTSRequest, normalized: str, engine_name: str = "primary") -> str:
+    # Chave sobre o texto normalizado: variações de grafia da mesma fala coincidem.
+    payload = req.model_dump(exclude={"variant", "enable_fallback"})
+    payload["text"] = normalized
+    payload["normalizer"] = NORMALIZER_VERSION
+    # A voz sozinha não identifica o áudio: VOICE_MODELS pode remapeá-la para outro modelo.
+    payload["model"] = resolve_model(req.voice)
+    if engine_name != "primary":
+        payload["engine"] = engine_name
+    if BACKEND != "torch":
+        # Áudio de backends quantizados/ONNX não é idêntico ao eager: cache separado.
+        payload["backend"] = BACKEND
+    if LEXICON_HASH:
+        payload["lexicon"] = LEXICON_HASH
+    return make_hash(payload)
+
+def sentence_key(sentence: str, req: TTSRequest, model: str) -> str:
+    # Frases são sempre sintetizadas neutras; velocidade e tom são pós-processamento.
+    payload = {
+        "sentence": " ".join(sentence.split()), "normalizer": NORMALIZER_VERSION,
+        "voice": req.voice, "model": model,
+    }
+    if BACKEND != "torch":
+        payload["backend"] = BACKEND
+    if LEXICON_HASH:
+        payload["lexicon"] = LEXICON_HASH
+    return make_hash(payload)
+
+def is_neutral(req: TTSRequest) -> bool:
+    return req.speed == 1.0 and req.pitch == 0.0
+
+def neutral(req: TTSRequest) -> TTSRequest:
+    # Base das variantes sempre do motor principal: derivada de áudio de contingência,
+    # a variante seria gravada sob a chave do principal. Falhas sobem para quem chamou.
+    return req.model_copy(update={"speed": 1.0, "pitch": 0.0, "variant": None, "enable_fallback": False})
+
+def _cached_sentence(key: str, meta: dict, sentence: str, data: bytes | None = None) -> dict:
+    count("sentence_hits")
+    if data is None:
+        data = cache.path(key, "sentence").read_bytes()
+        hot.put(key, "sentence", meta, data)
+    wav, sr = sf.read(io.BytesIO(data), dtype="float32")
+    words = meta.get("words") or approx_word_timings(sentence, wav.size / sr * 1000)
+    return {"wav": wav, "words": words, "phonemes": meta.get("phonemes", [])}
+
+def fetch_remote(key: str, tier: str) -> dict | None:
+    # Miss local: copia a entrada de outro nó do cluster, se algum a tiver.
+    if cluster is None:
+        return None
+    suffixes = (".wav", ".json", ".peaks") if tier == "full" else (".wav",)
+    meta = cluster.fetch(key, tier, cache.path(key, tier, mkdir=True).parent, suffixes)
+    if meta is not None:
+        count(f"{tier}_remote_hits")
+        cache.add(key, tier, meta, remote=True)
+    return meta
+
+def sentence_clip(model: str, sentence: str, key: str, sr: int) -> dict:
+    # {"wav", "words", "phonemes"} da frase, com timings relativos ao início dela.
+    entry = hot.get(key, "sentence")
+    if entry is not None:
+        if cluster is not None:
+            cluster.record_local(True)
+        return _cached_sentence(key, entry[0], sentence, entry[1])
+    meta = cache.get(key, "sentence")
+    if cluster is not None:
+        cluster.record_local(meta is not None)
+    if meta is not None:
+        return _cached_sentence(key, meta, sentence)
+    return flight.do(f"sentence:{key}", lambda: _synth_sentence(model, sentence, key, sr))
+
+def _synth_sentence(model: str, sentence: str, key: str, sr: int) -> dict:
+    # Líder do single-flight: a frase pode ter sido gravada enquanto esperávamos.
+    meta = cache.get(key, "sentence") or fetch_remote(key, "sentence")
+    if meta is not None:
+        return _cached_sentence(key, meta, sentence)
+    count("sentence_misses")
+    clip = scheduler.synthesize(model, sentence)
+    atomic_write(cache.path(key, "sentence", mkdir=True), lambda p: sf.write(p, clip["wav"], sr, format="WAV"))
+    cache.add(key, "sentence", {"words": clip["words"], "phonemes": clip["phonemes"]})
+    return clip
+
+def synth_sentences(chunks: list[str], req: TTSRequest, model: str, sr: int) -> list[dict]:
+    # Frases repetidas na mesma narração são sintetizadas uma única vez.
+    keys = [sentence_key(c, req, model) for c in chunks]
+    unique = dict(zip(keys, chunks))
+    clips = dict(zip(unique, synth_pool.map(lambda k: sentence_clip(model, unique[k], k, sr), unique)))
+    return [clips[k] for k in keys]
+
+def assemble(clips: list[dict], sr: int) -> tuple:
+    # Costura as frases e reposiciona os timings de cada uma no áudio final.
+    wav = crossfade_concat([c["wav"] for c in clips], sr, CROSSFADE_MS)
+    offsets = crossfade_offsets([len(c["wav"]) for c in clips], sr, CROSSFADE_MS)
+    words, phonemes = [], []
+    for clip, off in zip(clips, offsets):
+        words += shift_timings(clip["words"], off / sr * 1000)
+        phonemes += shift_timings(clip["phonemes"], off / sr * 1000)
+    return wav, words, phonemes
+
+def validate(req: TTSRequest):
     if not req.language.lower().startswith("pt"):
         raise HTTPException(status_code=400, detail="Somente pt-BR suportado nesta fase.")
-    if len(req.text.strip()) == 0 or len(req.text) > 800:
-        raise HTTPException(status_code=400, detail="Texto vazio ou > 800 caracteres.")
-
-    payload = req.model_dump()
-    key = make_hash(payload)
-    out_wav = CACHE_DIR / f"{key}.wav"
-    out_json = CACHE_DIR / f"{key}.json"
-
-    if out_wav.exists() and out_json.exists():
-        meta = json.loads(out_json.read_text())
-        return TTSResponse(wav_path=str(out_wav), sample_rate=meta["sample_rate"], words=meta["words"])
-
-    tts = TTS(MODEL_NAME)
-    # Coqui TTS gera áudio; não garante timestamps detalhados. Usaremos words=[] por enquanto.
-    wav = tts.tts(req.text)
-    sr = 22050
-    sf.write(out_wav, wav, sr)
-
-    meta = {"sample_rate": sr, "words": []}
-    out_json.write_text(json.dumps(meta, ensure_ascii=False))
-    return TTSResponse(wav_path=str(out_wav), sample_rate=sr, words=[])
+    if len(req.text.strip()) == 0 or len(req.text) > MAX_LONG_TEXT_CHARS:
+        raise HTTPException(status_code=400, detail=f"Texto vazio ou > {MAX_LONG_TEXT_CHARS} caracteres.")
+    if not (0.5 <= req.speed <= 2.0) or not (-12.0 <= req.pitch <= 12.0):
+        raise HTTPException(status_code=400, detail="speed deve estar entre 0.5 e 2.0 e pitch entre -12 e 12 semitons.")
+    if req.variant is not None:
+        try:
+            parse_variant(req.variant)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+def lookup(req: TTSRequest) -> tuple[str, str, TTSResponse | None]:
+    # Retorna (texto normalizado, chave, resposta se a narração completa já está no cache).
+    normalized = normalize_text(req.text)
+    key = request_key(req, normalized)
+    entry = hot.get(key, "full")
+    meta = entry[0] if entry is not None else cache.get(key, "full")
+    if cluster is not None:
+        cluster.record_local(meta is not None)
+    if meta is None:
+        count("full_misses")
+        return normalized, key, None
+    count("full_hits")
+    if entry is None:
+        # Segundo acesso em diante: passa a ser servido da memória.
+        hot.put(key, "full", meta)
+    return normalized, key, cached_response(key, meta, normalized)
+
+def cached_response(key: str, meta: dict, normalized: str) -> TTSResponse:
+    return TTSResponse(wav_path=str(cache.path(key, "full", ".wav")), sample_rate=meta["sample_rate"],
+                       words=meta["words"], phonemes=meta.get("phonemes", []), normalized_text=normalized,
+                       audio=meta.get("audio", {}), engine=meta.get("engine", "primary"))
+
+def store(key: str, wav, sr: int, normalized: str, words: list, phonemes: list,
+          engine_name: str = "primary") -> TTSResponse:
+    out_wav = cache.path(key, "full", ".wav", mkdir=True)
+    buf = io.BytesIO()
+    sf.write(buf, wav, sr, format="WAV")
+    data = buf.getvalue()
+    atomic_write(out_wav, lambda p: p.write_bytes(data))
+    # Metadados calculados aqui, uma vez: A2F e render leem o sidecar em vez do WAV.
+    # sha1 identifica o áudio em si: a chave identifica o pedido, e o VITS amostra
+    # ruído, então a mesma chave ressintetizada (após remoção, em outro nó) muda o áudio.
+    audio = audio_stats(wav, sr, RENDER_FPS) | {"sha1": hashlib.sha1(data).hexdigest()}
+    meta = {"sample_rate": sr, "words": words, "phonemes": phonemes, "audio": audio, "engine": engine_name}
+    atomic_write(cache.path(key, "full", ".json"),
+                 lambda p: p.write_text(json.dumps(meta, ensure_ascii=False)))
+    peaks = encode_peaks(wav, sr)
+    atomic_write(cache.path(key, "full", ".peaks"), lambda p: p.write_bytes(peaks))
+    cache.add(key, "full", meta)
+    return TTSResponse(wav_path=str(out_wav), sample_rate=sr, words=words, phonemes=phonemes,
+                       normalized_text=normalized, audio=meta["audio"], engine=engine_name)
+
+def ensure_variant(key: str, name: str) -> Path:
+    # Gerada uma vez por chave e reaproveitada; o tamanho entra no orçamento do cache.
+    suffix, args = parse_variant(name)
+    path = cache.path(key, "full", suffix)
+    if path.exists():
+        count("variant_hits")
+        return path
+    return flight.do(f"variant:{key}:{name}", lambda: _transcode_variant(key, path, args))
+
+def _transcode_variant(key: str, path: Path, args: list[str]) -> Path:
+    if not path.exists():
+        count("variant_misses")
+        try:
+            transcode(cache.path(key, "full", ".wav"), path, args)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise HTTPException(status_code=500, detail=f"Falha ao gerar variante {path.name}: {e}")
+        cache.add(key, "full")
+    return path
+
+def with_variant(resp: TTSResponse, req: TTSRequest) -> TTSResponse:
+    if req.variant is None:
+        return resp
+    path = ensure_variant(Path(resp.wav_path).stem, req.variant)
+    return resp.model_copy(update={"variant_path": str(path)})
+
+def accepts_fallback(item: TTSRequest) -> bool:
+    return item.enable_fallback and fallback_available()
+
+@app.post("/internal/tts", response_model=TTSResponse)
+def synth(req: TTSRequest):
+    validate(req)
+    normalized, key, hit = lookup(req)
+    if hit is not None:
+        return with_variant(hit, req)
+    use_fallback = accepts_fallback(req)
+    if use_fallback and queue_wait_s() * 1000 > FALLBACK_SLO_MS:
+        count("fallback_slo")
+        return with_variant(fallback_response(req, normalized), req)
+    try:
+        if not is_neutral(req):
+            resp = flight.do(f"full:{key}", lambda: _derive_full(req, normalized, key))
+        else:
+            resp = flight.do(f"full:{key}", lambda: _synth_full(req, normalized, key))
+    except Exception as e:
+        # Inclui o 429 da admissão: com contingência aceita, degrada em vez de recusar.
+        if not use_fallback:
+            raise
+        print(f"[tts] motor principal falhou, usando contingência: {e}")
+        count("fallback_errors")
+        resp = fallback_response(req, normalized)
+    return with_variant(resp, req)
+
+def fallback_response(req: TTSRequest, normalized: str) -> TTSResponse:
+    # Cacheado com chave própria: a narração do motor principal continua sendo gerada
+    # normalmente quando a carga normalizar.
+    key = request_key(req, normalized, "fallback")
+    meta = cache.get(key, "full")
+    if meta is not None:
+        return cached_response(key, meta, normalized)
+    return flight.do(f"full:{key}", lambda: _synth_fallback(req, normalized, key))
+
+def _synth_fallback(req: TTSRequest, normalized: str, key: str) -> TTSResponse:
+    meta = cache.get(key, "full")
+    if meta is not None:
+        return cached_response(key, meta, normalized)
+    count("fallback_synth")
+    wav, sr = synth_fallback(normalized, FALLBACK_VOICE)
+    if not is_neutral(req):
+        wav = apply_voice(wav, req.speed, req.pitch)
+    words = approx_word_timings(normalized, wav.size / sr * 1000)
+    return store(key, wav, sr, normalized, words, [], engine_name="fallback")
+
+def _derive_full(req: TTSRequest, normalized: str, key: str) -> TTSResponse:
+    # Variante de velocidade/tom derivada da narração neutra (cacheada à parte):
+    # prévias de velocidade custam milissegundos, sem nova passada no modelo.
+    meta = cache.get(key, "full") or fetch_remote(key, "full")
+    if meta is not None:
+        return cached_response(key, meta, normalized)
+    base = synth(neutral(req))
+    wav, sr = sf.read(base.wav_path, dtype="float32")
+    count("derived_variants")
+    scale = 1.0 / req.speed
+    return store(key, apply_voice(wav, req.speed, req.pitch), sr, normalized,
+                 shift_timings(base.words, scale=scale), shift_timings(base.phonemes, scale=scale))
+
+def _synth_full(req: TTSRequest, normalized: str, key: str) -> TTSResponse:
+    # Líder do single-flight: outra requisição pode ter concluído a mesma narração
+    # (aqui ou em outro nó do cluster).
+    meta = cache.get(key, "full") or fetch_remote(key, "full")
+    if meta is not None:
+        return cached_response(key, meta, normalized)
+    model = resolve_model(req.voice)
+    chunks = split_chunks(normalized, CHUNK_CHARS)
+    units = pending_units(sentence_key(c, req, model) for c in chunks)
+    admit(units)
+    try:
+        sr = engine.sample_rate(model)
+        wav, words, phonemes = assemble(synth_sentences(chunks, req, model, sr), sr)
+        return store(key, wav, sr, normalized, words, phonemes)
+    finally:
+        admission.release(units)
+
+@app.post("/internal/tts/batch", response_model=TTSBatchResponse)
+def synth_batch(req: TTSBatchRequest):
+    # Curso inteiro numa requisição: hits resolvidos no índice, e as frases de todos
+    # os itens pendentes sintetizadas numa única rodada (frases repetidas entre slides
+    # viram uma única síntese). Falha de um item não derruba os demais.
+    if len(req.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Lote com mais de {MAX_BATCH_ITEMS} itens.")
+    out: list[TTSBatchItem | None] = [None] * len(req.items)
+    pending, cache_hits = [], 0
+    for i, item in enumerate(req.items):
+        try:
+            validate(item)
+            normalized, key, hit = lookup(item)
+        except HTTPException as e:
+            out[i] = TTSBatchItem(index=i, status="error", error=str(e.detail))
+            continue
+        if hit is not None:
+            try:
+                out[i] = TTSBatchItem(index=i, status="ok", result=with_variant(hit, item))
+            except HTTPException as e:
+                out[i] = TTSBatchItem(index=i, status="error", error=str(e.detail))
+            cache_hits += 1
+            continue
+        model = resolve_model(item.voice)
+        chunks = split_chunks(normalized, CHUNK_CHARS)
+        keys = [sentence_key(c, item, model) for c in chunks]
+        pending.append((i, item, normalized, key, model, chunks, keys))
+
+    # Como em synth(): itens com contingência aceita degradam por item (SLO estourado
+    # ou fila cheia) em vez de esperar ou derrubar o lote com 429.
+    if pending and queue_wait_s() * 1000 > FALLBACK_SLO_MS:
+        pending = batch_fallback(out, pending, "fallback_slo")
+    units = pending_units(k for p in pending for k in p[6])
+    try:
+        admit(units)
+    except HTTPException:
+        if not any(accepts_fallback(p[1]) for p in pending):
+            raise
+        pending = batch_fallback(out, pending, "fallback_errors")
+        units = pending_units(k for p in pending for k in p[6])
+        try:
+            admit(units)
+        except HTTPException as e:
+            for p in pending:
+                out[p[0]] = TTSBatchItem(index=p[0], status="error", error=str(e.detail))
+            pending, units = [], 0
+    try:
+        return _synth_batch_pending(out, pending, cache_hits)
+    finally:
+        admission.release(units)
+
+def batch_fallback(out: list, pending: list, counter: str) -> list:
+    # Resolve no motor de contingência os itens que a aceitam; retorna os demais.
+    rest = []
+    for p in pending:
+        i, item, normalized = p[0], p[1], p[2]
+        if not accepts_fallback(item):
+            rest.append(p)
+            continue
+        count(counter)
+        try:
+            out[i] = TTSBatchItem(index=i, status="ok", result=with_variant(fallback_response(item, normalized), item))
+        except Exception as e:
+            out[i] = TTSBatchItem(index=i, status="error", error=str(e.detail if isinstance(e, HTTPException) else e))
+    return rest
+
+def _synth_batch_pending(out: list, pending: list, cache_hits: int) -> TTSBatchResponse:
+    rates = {}
+    for model in {p[4] for p in pending}:
+        try:
+            rates[model] = engine.sample_rate(model)
+        except Exception as e:
+            rates[model] = e
+    futures = {}
+    for _, _, _, _, model, chunks, keys in pending:
+        if isinstance(rates[model], Exception):
+            continue
+        for c, k in zip(chunks, keys):
+            if k not in futures:
+                futures[k] = synth_pool.submit(sentence_clip, model, c, k, rates[model])
+
+    for i, item, normalized, key, model, _, keys in pending:
+        try:
+            if isinstance(rates[model], Exception):
+                raise rates[model]
+            sr = rates[model]
+            wav, words, phonemes = assemble([futures[k].result() for k in keys], sr)
+            if not is_neutral(item):
+                base_key = request_key(neutral(item), normalized)
+                flight.do(f"full:{base_key}", lambda: store(base_key, wav, sr, normalized, words, phonemes))
+                wav = apply_voice(wav, item.speed, item.pitch)
+                words = shift_timings(words, scale=1.0 / item.speed)
+                phonemes = shift_timings(phonemes, scale=1.0 / item.speed)
+            result = flight.do(f"full:{key}", lambda: store(key, wav, sr, normalized, words, phonemes))
+            out[i] = TTSBatchItem(index=i, status="ok", result=with_variant(result, item))
+        except Exception as e:
+            out[i] = batch_error(i, item, normalized, e)
+    return TTSBatchResponse(items=out, cache_hits=cache_hits, synthesized_sentences=len(futures))
+
+def batch_error(i: int, item: TTSRequest, normalized: str, e: Exception) -> TTSBatchItem:
+    # Item com contingência aceita é refeito no motor de contingência.
+    if accepts_fallback(item):
+        count("fallback_errors")
+        try:
+            return TTSBatchItem(index=i, status="ok", result=with_variant(fallback_response(item, normalized), item))
+        except Exception as fe:
+            e = fe
+    return TTSBatchItem(index=i, status="error", error=str(e.detail if isinstance(e, HTTPException) else e))
+
+def release_once(units: int):
+    # Liberação idempotente: o gerador do stream e a BackgroundTask podem ambos chamá-la.
+    lock, done = threading.Lock(), [False]
+    def release():
+        with lock:
+            if done[0]:
+                return
+            done[0] = True
+        admission.release(units)
+    return release
+
+def stream_chunks(model: str, chunks: list[str], keys: list[str], sr: int, req: TTSRequest, release):
+    # Todos os trechos entram no pool de uma vez; cada um é enviado assim que ele
+    # e os anteriores terminam, para o cliente tocar em ordem.
+    futures = []
+    offset_ms = 0.0
+    try:
+        futures = [synth_pool.submit(sentence_clip, model, c, k, sr) for c, k in zip(chunks, keys)]
+        yield json.dumps({"type": "start", "sample_rate": sr, "format": "pcm_s16le",
+                          "channels": 1, "chunks": len(chunks)}) + "\n"
+        scale = 1.0 / req.speed
+        for i, (chunk, fut) in enumerate(zip(chunks, futures)):
+            clip = fut.result()
+            wav = clip["wav"] if is_neutral(req) else apply_voice(clip["wav"], req.speed, req.pitch)
+            pcm = to_pcm16(wav)
+            duration_ms = len(pcm) / 2 / sr * 1000
+            yield json.dumps({
+                "type": "chunk", "index": i, "text": chunk,
+                "offset_ms": int(round(offset_ms)), "duration_ms": int(round(duration_ms)),
+                "words": shift_timings(clip["words"], offset_ms, scale),
+                "phonemes": shift_timings(clip["phonemes"], offset_ms, scale),
+                "audio": base64.b64encode(pcm).decode("ascii"),
+            }, ensure_ascii=False) + "\n"
+            offset_ms += duration_ms
+        yield json.dumps({"type": "end", "duration_ms": int(round(offset_ms))}) + "\n"
+    finally:
+        # Cliente desconectou: não sintetiza trechos que ninguém vai ouvir.
+        for fut in futures:
+            fut.cancel()
+        release()
+
+@app.post("/internal/tts/stream")
+def synth_stream(req: TTSRequest):
+    # NDJSON em HTTP chunked: uma linha "start", uma "chunk" por frase (PCM s16le
+    # em base64 + timings de palavra e fonema) e uma "end".
+    validate(req)
+    model = resolve_model(req.voice)
+    sr = engine.sample_rate(model)
+    chunks = split_chunks(normalize_text(req.text), CHUNK_CHARS)
+    keys = [sentence_key(c, req, model) for c in chunks]
+    units = pending_units(keys)
+    admit(units)
+    # A admissão é tomada aqui para o 429 sair antes do stream começar. Se o cliente
+    # cair antes do primeiro next(), o finally do gerador nunca roda: a BackgroundTask,
+    # executada ao fim da resposta em qualquer caso, libera as unidades.
+    release = release_once(units)
+    return StreamingResponse(stream_chunks(model, chunks, keys, sr, req, release),
+                             media_type="application/x-ndjson", background=BackgroundTask(release))
+
+_KEY_RE = re.compile(r"^[0-9a-f]{40}$")
+
+def load_peaks(key: str) -> bytes:
+    # Entradas anteriores aos picos são completadas na primeira consulta.
+    path = cache.path(key, "full", ".peaks")
+    if path.exists():
+        return path.read_bytes()
+    wav, sr = sf.read(cache.path(key, "full", ".wav"), dtype="float32")
+    peaks = encode_peaks(wav, sr)
+    atomic_write(path, lambda p: p.write_bytes(peaks))
+    cache.add(key, "full")
+    return peaks
+
+def audio_sha1(key: str, meta: dict) -> str:
+    # Identidade do áudio gravado sob a chave. A chave não serve: ressintetizada (após
+    # remoção, em outro nó) ela aponta para outro áudio. Entradas anteriores ao sha1
+    # no sidecar têm o WAV lido.
+    sha1 = meta.get("audio", {}).get("sha1")
+    if not sha1:
+        sha1 = hashlib.sha1(cache.path(key, "full", ".wav").read_bytes()).hexdigest()
+    return sha1
+
+@app.get("/internal/tts/peaks/{key}")
+def peaks_endpoint(key: str, request: Request, format: str = "bin"):
+    # Picos min/max (int8) em vários níveis de zoom. ETag pelo conteúdo do áudio:
+    # o cliente revalida (no-cache) e recebe 304 enquanto o áudio for o mesmo.
+    if not _KEY_RE.match(key) or format not in ("bin", "json"):
+        raise HTTPException(status_code=400, detail="Chave ou formato inválido.")
+    meta = cache.get(key, "full")
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Narração não encontrada no cache.")
+    etag = f'"{audio_sha1(key, meta)}-p{PEAKS_VERSION}-{format}"'
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    data = load_peaks(key)
+    if format == "json":
+        return Response(json.dumps(decode_peaks(data)), media_type="application/json", headers=headers)
+    return Response(data, media_type="application/octet-stream", headers=headers)
+
+@app.get("/internal/tts/variants/{key}/{name}")
+def variant_endpoint(key: str, name: str, request: Request):
+    # Arquivo da variante (gerado na primeira chamada). Como nos picos, o ETag vem do
+    # áudio de origem e o cliente revalida.
+    try:
+        parse_variant(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    meta = cache.get(key, "full") if _KEY_RE.match(key) else None
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Narração não encontrada no cache.")
+    etag = f'"{audio_sha1(key, meta)}-{name}"'
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    path = ensure_variant(key, name)
+    return FileResponse(path, headers=headers)
+
+warmup_job: WarmupJob | None = None
+warmup_lock = threading.Lock()
+
+def phrase_cached(phrase: str, voice: str | None) -> bool:
+    req = TTSRequest(text=phrase, voice=voice)
+    model = resolve_model(voice)
+    return all(cache.contains(sentence_key(c, req, model), "sentence")
+               for c in split_chunks(normalize_text(phrase), CHUNK_CHARS))
+
+def warm_phrase(phrase: str, voice: str | None):
+    # Aquece só o nível de frases: é ele que as narrações reaproveitam. Uma entrada
+    # "full" por frase minerada ocuparia disco e LRU com chaves que ninguém consulta.
+    req = TTSRequest(text=phrase, voice=voice)
+    model = resolve_model(voice)
+    chunks = split_chunks(normalize_text(phrase), CHUNK_CHARS)
+    units = pending_units(sentence_key(c, req, model) for c in chunks)
+    admit(units)
+    try:
+        synth_sentences(chunks, req, model, engine.sample_rate(model))
+    finally:
+        admission.release(units)
+
+@app.post("/internal/tts/warmup")
+def warmup_start(req: WarmupRequest):
+    # Roda em segundo plano; acompanhe em GET /internal/tts/warmup.
+    global warmup_job
+    if not (req.rate_per_s > 0 and math.isfinite(req.rate_per_s)):
+        raise HTTPException(status_code=400, detail="rate_per_s deve ser maior que zero.")
+    phrases = list(req.phrases)
+    if req.from_redis:
+        import redis
+        try:
+            phrases += mine_redis(req.top, req.min_count, CHUNK_CHARS)
+        except redis.RedisError as e:
+            raise HTTPException(status_code=503, detail=f"Redis indisponível: {e}")
+    phrases = [p for p in phrases if 0 < len(p) <= MAX_LONG_TEXT_CHARS]
+    # Verificação e troca sob lock: um job recém-criado fica "pending" até a thread
+    # começar, e duas chamadas simultâneas não podem ambas passar.
+    with warmup_lock:
+        if warmup_job is not None and warmup_job.state in ("pending", "running"):
+            raise HTTPException(status_code=409, detail="Aquecimento já em andamento.")
+        warmup_job = WarmupJob(
+            phrases, req.rate_per_s,
+            is_cached=lambda p: phrase_cached(p, req.voice),
+            synth=lambda p: warm_phrase(p, req.voice),
+            is_idle=lambda: admission.in_use == 0)
+        warmup_job.start()
+        return warmup_job.stats()
+
+@app.get("/internal/tts/warmup")
+def warmup_status():
+    return warmup_job.stats() if warmup_job is not None else {"state": "idle"}
+
+@app.post("/internal/tts/warmup/cancel")
+def warmup_cancel():
+    if warmup_job is not None:
+        warmup_job.cancel()
+    return warmup_status()
+
+_ARTIFACT_RE = re.compile(r"^([0-9a-f]{40})(\.wav|\.json|\.peaks)$")
+
+@app.get("/internal/tts/artifacts/{tier}/{filename}")
+def artifact_endpoint(tier: str, filename: str):
+    # Arquivos do cache local, para outros nós do cluster copiarem num miss.
+    m = _ARTIFACT_RE.match(filename)
+    if tier not in TIER_DIRS or m is None:
+        raise HTTPException(status_code=400, detail="Arquivo de cache inválido.")
+    path = cache.path(m.group(1), tier, m.group(2))
+    if not cache.contains(m.group(1), tier) or not path.exists():
+        raise HTTPException(status_code=404, detail="Entrada não encontrada neste nó.")
+    return FileResponse(path)
+
+@app.get("/internal/tts/cache/stats")
+def cache_stats_endpoint():
+    return cache.stats()
+
+@app.post("/internal/tts/cache/purge")
+def cache_purge(req: PurgeRequest):
+    if req.tier is not None and req.tier not in TIER_DIRS:
+        raise HTTPException(status_code=400, detail=f"Nível de cache inválido: {req.tier}")
+    return {"removed": cache.purge(req.tier, req.older_than_s)}
+
+@app.get("/internal/tts/stats")
+def stats():
+    return {"engine": engine.stats(), "batching": scheduler.stats(), "admission": admission.stats(),
+            "queue_depth": admission.in_use, "single_flight": flight.stats(),
+            "cache": {**dict(cache_stats), "index": cache.stats()},
+            "hot": hot.stats(), "cluster": cluster.stats() if cluster is not None else None}
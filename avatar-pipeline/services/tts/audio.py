@@ -0,0 +1,165 @@
+
+# Utilitários de áudio (NumPy) do serviço TTS.
+import numpy as np
+
+def _fades(sizes: list[int], sr: int, fade_ms: int) -> list[int]:
+    n = int(sr * fade_ms / 1000)
+    return [min(n, a, b) for a, b in zip(sizes, sizes[1:])] + [0]
+
+def crossfade_offsets(sizes: list[int], sr: int, fade_ms: int = 30) -> list[int]:
+    # Amostra inicial de cada trecho no resultado de crossfade_concat.
+    offsets, pos, nonempty = [], 0, [s for s in sizes if s]
+    fades = iter(_fades(nonempty, sr, fade_ms))
+    for size in sizes:
+        offsets.append(pos)
+        if size:
+            pos += size - next(fades)
+    return offsets
+
+def crossfade_concat(chunks: list, sr: int, fade_ms: int = 30) -> np.ndarray:
+    # Concatena os trechos com crossfade de potência constante entre vizinhos.
+    chunks = [np.asarray(c, dtype=np.float32).reshape(-1) for c in chunks]
+    chunks = [c for c in chunks if c.size]
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    fades = _fades([c.size for c in chunks], sr, fade_ms)
+    out = np.zeros(sum(c.size for c in chunks) - sum(fades), dtype=np.float32)
+    pos = 0
+    for i, c in enumerate(chunks):
+        f_in = fades[i - 1] if i else 0
+        if f_in:
+            t = np.linspace(0.0, np.pi / 2, f_in, dtype=np.float32)
+            out[pos:pos + f_in] *= np.cos(t)
+            c = c.copy()
+            c[:f_in] *= np.sin(t)
+        out[pos:pos + c.size] += c
+        pos += c.size - fades[i]
+    return out
+
+def to_pcm16(wav) -> bytes:
+    wav = np.clip(np.asarray(wav, dtype=np.float32).reshape(-1), -1.0, 1.0)
+    return (wav * 32767.0).astype("<i2").tobytes()
+
+# Velocidade e tom aplicados como pós-processamento sobre a síntese neutra
+# (phase vocoder + reamostragem), vetorizado por quadro/bin.
+N_FFT = 1024
+HOP = 256
+
+def _stft(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    win = np.hanning(N_FFT + 1)[:-1].astype(np.float32)
+    padded = np.pad(x, (N_FFT // 2, N_FFT // 2 + HOP))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, N_FFT)[::HOP]
+    return np.fft.rfft(frames * win, axis=1), win
+
+def _istft(spec: np.ndarray, win: np.ndarray, length: int) -> np.ndarray:
+    frames = np.fft.irfft(spec, n=N_FFT, axis=1).astype(np.float32) * win
+    t, k = frames.shape[0], N_FFT // HOP
+    out = np.zeros((t + k - 1) * HOP, dtype=np.float32)
+    norm = np.zeros_like(out)
+    blocks = frames.reshape(t, k, HOP)
+    w2 = (win ** 2).reshape(k, HOP)
+    # Overlap-add em k deslocamentos (N_FFT / HOP), cada um somando todos os quadros.
+    for j in range(k):
+        out[j * HOP:(j + t) * HOP] += blocks[:, j].reshape(-1)
+        norm[j * HOP:(j + t) * HOP] += np.tile(w2[j], t)
+    out /= np.maximum(norm, 1e-6)
+    return out[N_FFT // 2:N_FFT // 2 + length]
+
+def time_stretch(x: np.ndarray, rate: float) -> np.ndarray:
+    # rate > 1 acelera (áudio mais curto) sem alterar o tom.
+    x = np.asarray(x, dtype=np.float32).reshape(-1)
+    if abs(rate - 1.0) < 1e-3 or x.size < N_FFT:
+        return x
+    spec, win = _stft(x)
+    steps = np.arange(0, spec.shape[0] - 1, rate)
+    i = steps.astype(np.int64)
+    frac = (steps - i)[:, None]
+    mag = (1 - frac) * np.abs(spec[i]) + frac * np.abs(spec[i + 1])
+    omega = 2 * np.pi * HOP * np.arange(spec.shape[1]) / N_FFT
+    dphi = np.angle(spec[i + 1]) - np.angle(spec[i]) - omega
+    dphi -= 2 * np.pi * np.round(dphi / (2 * np.pi))
+    advance = np.cumsum(omega + dphi, axis=0)
+    phase = np.angle(spec[0]) + np.vstack([np.zeros_like(omega), advance[:-1]])
+    return _istft(mag * np.exp(1j * phase), win, int(round(x.size / rate)))
+
+def resample_linear(x: np.ndarray, factor: float) -> np.ndarray:
+    # Lê o sinal em passos de `factor`: duração / factor, frequências * factor.
+    n = int(x.size / factor)
+    return np.interp(np.arange(n) * factor, np.arange(x.size), x).astype(np.float32)
+
+def apply_voice(wav, speed: float = 1.0, pitch: float = 0.0) -> np.ndarray:
+    # pitch em semitons. Um único stretch seguido de reamostragem resolve os dois.
+    wav = np.asarray(wav, dtype=np.float32).reshape(-1)
+    factor = 2.0 ** (pitch / 12.0)
+    out = time_stretch(wav, speed / factor)
+    return resample_linear(out, factor) if abs(factor - 1.0) > 1e-3 else out
+
+def _biquad(b: list, a: list):
+    return np.array(b) / a[0], np.array(a) / a[0]
+
+def k_weighting(sr: int) -> list:
+    # Filtros da BS.1770 (shelf de alta + passa-altas) para qualquer taxa de amostragem.
+    gain_db, q, fc = 4.0, 1 / np.sqrt(2), 1500.0
+    A = 10 ** (gain_db / 40)
+    w0 = 2 * np.pi * fc / sr
+    alpha = np.sin(w0) / (2 * q)
+    cw, sa = np.cos(w0), 2 * np.sqrt(A) * alpha
+    shelf = _biquad([A * ((A + 1) + (A - 1) * cw + sa), -2 * A * ((A - 1) + (A + 1) * cw),
+                     A * ((A + 1) + (A - 1) * cw - sa)],
+                    [(A + 1) - (A - 1) * cw + sa, 2 * ((A - 1) - (A + 1) * cw), (A + 1) - (A - 1) * cw - sa])
+    q, fc = 0.5, 38.0
+    w0 = 2 * np.pi * fc / sr
+    alpha, cw = np.sin(w0) / (2 * q), np.cos(w0)
+    highpass = _biquad([(1 + cw) / 2, -(1 + cw), (1 + cw) / 2], [1 + alpha, -2 * cw, 1 - alpha])
+    return [shelf, highpass]
+
+def integrated_loudness(wav: np.ndarray, sr: int) -> float | None:
+    # LUFS integrado (BS.1770-4): blocos de 400 ms com 75% de sobreposição,
+    # gate absoluto em -70 LUFS e relativo em -10 LU.
+    from scipy.signal import lfilter
+    y = np.asarray(wav, dtype=np.float64)
+    for b, a in k_weighting(sr):
+        y = lfilter(b, a, y)
+    block, step = int(0.4 * sr), int(0.1 * sr)
+    sq = np.concatenate([[0.0], np.cumsum(y * y)])
+    if y.size < block:
+        z = np.array([sq[-1] / max(y.size, 1)])
+    else:
+        starts = np.arange(0, y.size - block + 1, step)
+        z = (sq[starts + block] - sq[starts]) / block
+    with np.errstate(divide="ignore"):
+        lk = -0.691 + 10 * np.log10(z)
+    z = z[lk > -70.0]
+    if not z.size:
+        return None
+    rel = -0.691 + 10 * np.log10(z.mean()) - 10.0
+    with np.errstate(divide="ignore"):
+        z = z[-0.691 + 10 * np.log10(z) > rel]
+    return round(float(-0.691 + 10 * np.log10(z.mean())), 2)
+
+def _dbfs(x: float) -> float | None:
+    return round(20 * float(np.log10(x)), 2) if x > 0 else None
+
+def audio_stats(wav, sr: int, fps: int = 30) -> dict:
+    # Metadados calculados uma vez na síntese, para os estágios seguintes não
+    # precisarem decodificar o WAV: duração, pico, RMS, loudness e envelope RMS
+    # por quadro de vídeo.
+    y = np.asarray(wav, dtype=np.float32).reshape(-1)
+    peak = float(np.abs(y).max()) if y.size else 0.0
+    rms = float(np.sqrt(np.mean(y.astype(np.float64) ** 2))) if y.size else 0.0
+    spf = sr / fps
+    n_frames = int(np.ceil(y.size / spf)) if y.size else 0
+    idx = (np.arange(n_frames + 1) * spf).astype(np.int64).clip(0, y.size)
+    sq = np.concatenate([[0.0], np.cumsum(y.astype(np.float64) ** 2)])
+    counts = np.maximum(np.diff(idx), 1)
+    envelope = np.sqrt((sq[idx[1:]] - sq[idx[:-1]]) / counts)
+    return {
+        "duration_ms": int(round(y.size / sr * 1000)),
+        "samples": int(y.size),
+        "peak": round(peak, 5),
+        "peak_dbfs": _dbfs(peak),
+        "rms": round(rms, 5),
+        "rms_dbfs": _dbfs(rms),
+        "loudness_lufs": integrated_loudness(y, sr) if y.size else None,
+        "envelope": {"fps": fps, "rms": np.round(envelope, 4).tolist()},
+    }
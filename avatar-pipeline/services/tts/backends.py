@@ -0,0 +1,113 @@
+
+# Backends de inferência para CPU, escolhidos por TTS_BACKEND:
+#   "torch"      -> PyTorch eager (padrão)
+#   "torch-int8" -> quantização dinâmica int8 das camadas Linear (torch.quantization)
+#   "onnx"       -> modelo VITS exportado para ONNX, executado no ONNX Runtime (CPU)
+#   "onnx-int8"  -> o mesmo ONNX com pesos quantizados em int8 (onnxruntime.quantization)
+# O ONNX é exportado uma vez por modelo em TTS_ONNX_DIR e reaproveitado entre processos.
+# Nos backends ONNX o grafo não devolve durações: os timings de palavra são aproximados.
+#
+# Paridade e RTF contra o eager:
+#   python -m services.tts.backends --backends torch,torch-int8,onnx --texts frases.txt
+import argparse, os, re, sys, time
+from pathlib import Path
+import numpy as np
+from services.tts.audio import _stft
+from services.tts.cache import atomic_write
+from services.tts.g2p import G2P_ENABLED, install_g2p
+from services.tts.weights import MMAP_WEIGHTS, share_weights
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+ONNX_DIR = Path(os.getenv("TTS_ONNX_DIR", "/data/tts_models/onnx"))
+
+def onnx_path(name: str, int8: bool = False) -> Path:
+    return ONNX_DIR / (re.sub(r"[^\w.-]+", "--", name) + (".int8" if int8 else "") + ".onnx")
+
+def load_model(name: str, backend: str = "torch"):
+    from TTS.api import TTS
+    tts = TTS(name)
+    model = getattr(getattr(tts, "synthesizer", None), "tts_model", None)
+    tts.mmap_weights = bool(MMAP_WEIGHTS and model is not None and backend.startswith("torch")
+                            and share_weights(model, name))
+    tts.g2p_cache = G2P_ENABLED and install_g2p(tts, name)
+    return prepare(tts, name, backend)
+
+def prepare(tts, name: str, backend: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"TTS_BACKEND inválido: {backend}")
+    tts.backend = backend
+    if backend == "torch":
+        return tts
+    import torch
+    model = tts.synthesizer.tts_model
+    if backend == "torch-int8":
+        # Somente Linear tem versão dinâmica int8; as convoluções seguem em float.
+        tts.synthesizer.tts_model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return tts
+    if type(model).__name__ != "Vits" or getattr(model, "num_speakers", 0) > 1:
+        raise ValueError(f"Backend {backend} requer um modelo VITS de um locutor: {name}")
+    path = export_onnx(model, name, int8=backend == "onnx-int8")
+    import onnxruntime as ort
+    opts = ort.SessionOptions()
+    # Mesmo número de threads do torch: respeita a fatia de núcleos do processo.
+    opts.intra_op_num_threads = torch.get_num_threads()
+    opts.inter_op_num_threads = 1
+    model.onnx_sess = ort.InferenceSession(str(path), sess_options=opts, providers=["CPUExecutionProvider"])
+    return tts
+
+def export_onnx(model, name: str, int8: bool = False) -> Path:
+    path = onnx_path(name)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, lambda p: model.export_onnx(output_path=str(p), verbose=False))
+    if not int8:
+        return path
+    qpath = onnx_path(name, int8=True)
+    if not qpath.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        atomic_write(qpath, lambda p: quantize_dynamic(str(path), str(p), weight_type=QuantType.QInt8))
+    return qpath
+
+def spectral_similarity(ref: np.ndarray, other: np.ndarray) -> float:
+    # Correlação entre log-espectrogramas, com o tempo do segundo reescalado para o do
+    # primeiro. O VITS amostra ruído na síntese, então a comparação amostra a amostra
+    # não faz sentido; o conteúdo espectral quadro a quadro, sim.
+    a = np.log1p(np.abs(_stft(np.asarray(ref, dtype=np.float32))[0]))
+    b = np.log1p(np.abs(_stft(np.asarray(other, dtype=np.float32))[0]))
+    idx = np.linspace(0, b.shape[0] - 1, a.shape[0]).round().astype(int)
+    a, b = a.ravel() - a.mean(), b[idx].ravel() - b.mean()
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-12))
+
+def main(argv=None):
+    from services.tts.inference import infer_batch
+    ap = argparse.ArgumentParser(description="Paridade e RTF dos backends de TTS")
+    ap.add_argument("--model", default=os.getenv("TTS_MODEL_NAME", "tts_models/pt/cv/vits"))
+    ap.add_argument("--backends", default=",".join(BACKENDS))
+    ap.add_argument("--texts", help="arquivo com uma frase por linha")
+    ap.add_argument("--min-similarity", type=float, default=0.8)
+    args = ap.parse_args(argv)
+    texts = (Path(args.texts).read_text(encoding="utf-8").splitlines() if args.texts else
+             ["Bem-vindo ao treinamento de segurança do trabalho.",
+              "Use sempre os equipamentos de proteção individual adequados à atividade."])
+    texts = [t for t in texts if t.strip()]
+    reference, failed = None, False
+    for backend in args.backends.split(","):
+        tts = load_model(args.model, backend)
+        infer_batch(tts, texts[:1])  # aquecimento
+        t0 = time.perf_counter()
+        results = [infer_batch(tts, [t])[0] for t in texts]
+        elapsed = time.perf_counter() - t0
+        audio_s = sum(r["wav"].size / r["sample_rate"] for r in results)
+        line = {"backend": backend, "rtf": round(elapsed / audio_s, 4), "audio_s": round(audio_s, 2)}
+        if reference is None:
+            reference = results
+        else:
+            sims = [spectral_similarity(r["wav"], o["wav"]) for r, o in zip(reference, results)]
+            ratios = [o["wav"].size / r["wav"].size for r, o in zip(reference, results)]
+            line |= {"similarity_min": round(min(sims), 4), "duration_ratio": round(float(np.mean(ratios)), 3)}
+            failed |= min(sims) < args.min_similarity
+        print(line)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+
+# Micro-batching dinâmico: requisições concorrentes que chegam dentro de uma janela
+# curta (ou até completar o lote) são inferidas juntas, uma chamada por modelo.
+import queue, threading, time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class BatchScheduler:
+    def __init__(self, infer_batch, window_ms: int = 20, max_batch: int = 8, workers: int = 1):
+        # infer_batch(model_name, texts) -> lista de áudios na mesma ordem.
+        self._infer_batch = infer_batch
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[tuple[str, str, Future]]" = queue.Queue()
+        self._runners = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-infer")
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.max_seen = 0
+        # Média móvel do custo de inferência por item (s), usada para estimar espera.
+        self.item_s = 0.0
+        threading.Thread(target=self._loop, name="tts-batcher", daemon=True).start()
+
+    def submit(self, model: str, text: str) -> Future:
+        fut = Future()
+        self._queue.put((model, text, fut))
+        return fut
+
+    def synthesize(self, model: str, text: str):
+        return self.submit(model, text).result()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_s
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            groups = defaultdict(list)
+            for model, text, fut in self._collect():
+                if fut.set_running_or_notify_cancel():
+                    groups[model].append((text, fut))
+            for model, items in groups.items():
+                self._runners.submit(self._run, model, items)
+
+    def _run(self, model: str, items: list):
+        with self._lock:
+            self.batches += 1
+            self.items += len(items)
+            self.max_seen = max(self.max_seen, len(items))
+        t0 = time.monotonic()
+        try:
+            wavs = self._infer_batch(model, [t for t, _ in items])
+        except Exception as e:
+            for _, fut in items:
+                fut.set_exception(e)
+            return
+        per_item = (time.monotonic() - t0) / len(items)
+        with self._lock:
+            self.item_s = per_item if not self.item_s else 0.8 * self.item_s + 0.2 * per_item
+        for (_, fut), wav in zip(items, wavs):
+            fut.set_result(wav)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window_ms": int(self.window_s * 1000),
+                "max_batch": self.max_batch,
+                "queue_depth": self.depth(),
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "max_batch_seen": self.max_seen,
+                "item_ms": int(self.item_s * 1000),
+            }
+
+class AdmissionQueue:
+    # Limite de trabalho aceito (em frases) ainda não concluído. Acima dele o serviço
+    # recusa na entrada em vez de acumular fila invisível até o cliente estourar timeout.
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def try_acquire(self, units: int) -> bool:
+        with self._lock:
+            # Com a fila vazia, aceita mesmo um pedido maior que a capacidade.
+            if self.in_use and self.in_use + units > self.capacity:
+                self.rejected += 1
+                return False
+            self.in_use += units
+            self.admitted += 1
+            return True
+
+    def release(self, units: int):
+        with self._lock:
+            self.in_use -= units
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"capacity": self.capacity, "depth": self.in_use,
+                    "admitted": self.admitted, "rejected": self.rejected}
@@ -0,0 +1,325 @@
+
+# Cache de áudio indexado em SQLite, com orçamento de bytes e remoção LRU.
+# Arquivos ficam em subdiretórios por prefixo do hash (ab/cd/<hash>.wav) e cada
+# consulta é uma leitura no índice, sem stat no sistema de arquivos.
+import json, os, re, sqlite3, threading, time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT NOT NULL,
+    tier TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    meta TEXT,
+    PRIMARY KEY (key, tier)
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access);
+"""
+
+# Diretório de cada nível dentro da raiz do cache.
+TIER_DIRS = {"full": "", "sentence": "sentences"}
+_LEGACY_RE = re.compile(r"^[0-9a-f]{40}$")
+
+def atomic_write(path: Path, write):
+    # Escreve num temporário no mesmo diretório e renomeia: leitores (inclusive de
+    # outros processos) nunca veem arquivo parcial, e escritas concorrentes não se misturam.
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+class SingleFlight:
+    # Coalescência de chamadas concorrentes com a mesma chave: a primeira (líder)
+    # executa, as demais esperam o resultado dela.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn):
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return fut.result()
+        try:
+            result = fn()
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+class AudioCache:
+    def __init__(self, root: Path, max_bytes: int, fanout: int = 2):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.fanout = fanout
+        self.db_path = root / "index.sqlite3"
+        self._local = threading.local()
+        self._evict_lock = threading.Lock()
+        self.evictions = 0
+        # Observadores de inclusão (key, tier, path, size, meta, remote) e remoção (key, tier):
+        # índice do cluster, nível em memória.
+        self.on_add: list = []
+        self.on_remove: list = []
+        self._db().executescript(SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        # Uma conexão por thread; WAL permite leitores concorrentes entre processos.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _dir(self, key: str, tier: str) -> Path:
+        d = self.root / TIER_DIRS[tier]
+        for i in range(self.fanout):
+            d = d / key[2 * i:2 * i + 2]
+        return d
+
+    def path(self, key: str, tier: str, suffix: str = ".wav", mkdir: bool = False) -> Path:
+        d = self._dir(key, tier)
+        if mkdir:
+            d.mkdir(parents=True, exist_ok=True)
+        return d / f"{key}{suffix}"
+
+    def _files(self, key: str, tier: str) -> list[Path]:
+        return list(self._dir(key, tier).glob(f"{key}*"))
+
+    def get(self, key: str, tier: str) -> dict | None:
+        db = self._db()
+        row = db.execute("SELECT meta FROM entries WHERE key=? AND tier=?", (key, tier)).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE entries SET last_access=?, hits=hits+1 WHERE key=? AND tier=?",
+                   (time.time(), key, tier))
+        return json.loads(row[0]) if row[0] else {}
+
+    def touch(self, hits: dict):
+        # {(key, tier): n}: acessos servidos fora do índice (nível em memória) entram no LRU.
+        now = time.time()
+        self._db().executemany("UPDATE entries SET last_access=?, hits=hits+? WHERE key=? AND tier=?",
+                               [(now, n, key, tier) for (key, tier), n in hits.items()])
+
+    def created(self, entries: list[tuple[str, str]]) -> dict:
+        # {(key, tier): created} das entradas ainda indexadas. Uma entrada removida e
+        # regravada (por qualquer processo) volta com created novo.
+        db, out = self._db(), {}
+        for i in range(0, len(entries), 500):
+            keys = list({k for k, _ in entries[i:i + 500]})
+            rows = db.execute(f"SELECT key, tier, created FROM entries WHERE key IN ({','.join('?' * len(keys))})",
+                              keys).fetchall()
+            out.update(((k, t), c) for k, t, c in rows)
+        return out
+
+    def contains(self, key: str, tier: str) -> bool:
+        # Consulta sem contar hit nem renovar o LRU (uso administrativo, ex.: warmup).
+        return self._db().execute("SELECT 1 FROM entries WHERE key=? AND tier=?", (key, tier)).fetchone() is not None
+
+    def adopt_legacy(self) -> int:
+        # Varredura única no startup: arquivos do layout antigo (diretório plano, sem
+        # índice) vão para os subdiretórios e entram no índice com o mtime como último
+        # acesso. As chaves mudaram desde então (texto normalizado), então nenhum pedido
+        # os encontra: são contados no orçamento e removidos primeiro pelo LRU.
+        db, adopted = self._db(), 0
+        for tier, sub in TIER_DIRS.items():
+            for wav in (self.root / sub).glob("*.wav"):
+                key = wav.stem
+                if not _LEGACY_RE.match(key):
+                    continue
+                try:
+                    mtime = wav.stat().st_mtime
+                    for old in wav.parent.glob(f"{key}.*"):
+                        old.rename(self.path(key, tier, old.suffix, mkdir=True))
+                except FileNotFoundError:
+                    continue  # outro processo migrando a mesma entrada
+                sidecar = self.path(key, tier, ".json")
+                meta = sidecar.read_text() if sidecar.exists() else None
+                size = sum(p.stat().st_size for p in self._files(key, tier))
+                db.execute("INSERT OR IGNORE INTO entries (key, tier, size, created, last_access, hits, meta) "
+                           "VALUES (?, ?, ?, ?, ?, 0, ?)", (key, tier, size, mtime, mtime, meta))
+                adopted += 1
+        if adopted:
+            self.evict()
+        return adopted
+
+    def add(self, key: str, tier: str, meta: dict | None = None, remote: bool = False):
+        # Registra (ou atualiza) a entrada depois que seus arquivos foram escritos.
+        # remote: cópia trazida de outro nó (o dono continua sendo ele).
+        size = sum(p.stat().st_size for p in self._files(key, tier))
+        now = time.time()
+        self._db().execute(
+            "INSERT INTO entries (key, tier, size, created, last_access, hits, meta) "
+            "VALUES (?, ?, ?, ?, ?, 0, ?) "
+            "ON CONFLICT (key, tier) DO UPDATE SET size=excluded.size, "
+            "last_access=excluded.last_access, meta=COALESCE(excluded.meta, entries.meta)",
+            (key, tier, size, now, now, json.dumps(meta, ensure_ascii=False) if meta is not None else None))
+        for fn in self.on_add:
+            fn(key, tier, self.path(key, tier), size, meta, remote)
+        self.evict()
+
+    def total_bytes(self) -> int:
+        return self._db().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        if self.total_bytes() <= self.max_bytes:
+            return
+        with self._evict_lock:
+            db = self._db()
+            excess = self.total_bytes() - self.max_bytes
+            while excess > 0:
+                rows = db.execute("SELECT key, tier, size FROM entries ORDER BY last_access LIMIT 256").fetchall()
+                if not rows:
+                    break
+                for key, tier, size in rows:
+                    self._remove(key, tier)
+                    self.evictions += 1
+                    excess -= size
+                    if excess <= 0:
+                        break
+
+    def _remove(self, key: str, tier: str):
+        for p in self._files(key, tier):
+            p.unlink(missing_ok=True)
+        self._db().execute("DELETE FROM entries WHERE key=? AND tier=?", (key, tier))
+        for fn in self.on_remove:
+            fn(key, tier)
+
+    def purge(self, tier: str | None = None, older_than_s: float | None = None) -> int:
+        sql, args = "SELECT key, tier FROM entries WHERE 1=1", []
+        if tier:
+            sql += " AND tier=?"
+            args.append(tier)
+        if older_than_s is not None:
+            sql += " AND last_access < ?"
+            args.append(time.time() - older_than_s)
+        rows = self._db().execute(sql, args).fetchall()
+        for key, t in rows:
+            self._remove(key, t)
+        return len(rows)
+
+    def stats(self) -> dict:
+        rows = self._db().execute(
+            "SELECT tier, COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) "
+            "FROM entries GROUP BY tier").fetchall()
+        return {
+            "max_bytes": self.max_bytes,
+            "total_bytes": sum(r[2] for r in rows),
+            "evictions": self.evictions,
+            "tiers": {r[0]: {"entries": r[1], "bytes": r[2], "hits": r[3]} for r in rows},
+        }
+
+class HotTier:
+    # LRU em memória na frente do índice em disco: metadados (e, para clipes curtos,
+    # os bytes do arquivo) das entradas acessadas mais de uma vez. Um hit aqui não
+    # consulta o SQLite nem o sistema de arquivos; os acessos são repassados ao LRU
+    # em disco em lote, a cada flush_s, para as entradas quentes não serem removidas.
+    # No mesmo ciclo, created(entries) confere as entradas contra o índice: as que outro
+    # processo removeu ou regravou depois de entrarem aqui são descartadas.
+    def __init__(self, max_bytes: int, max_item_bytes: int, touch, created=None, flush_s: float = 5.0):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._touch = touch
+        self._created = created
+        # (key, tier) -> (meta, bytes, custo, instante da inclusão)
+        self._items: "OrderedDict[tuple[str, str], tuple[dict, bytes | None, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if max_bytes > 0:
+            threading.Thread(target=self._flush_loop, args=(flush_s,), name="tts-hot-flush", daemon=True).start()
+
+    def get(self, key: str, tier: str) -> tuple[dict, bytes | None] | None:
+        with self._lock:
+            item = self._items.get((key, tier))
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end((key, tier))
+            self.hits += 1
+            self._pending[(key, tier)] += 1
+            return item[0], item[1]
+
+    def put(self, key: str, tier: str, meta: dict, data: bytes | None = None):
+        if data is not None and len(data) > self.max_item_bytes:
+            data = None
+        cost = len(json.dumps(meta, ensure_ascii=False)) + (len(data) if data is not None else 0)
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop((key, tier), None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._items[(key, tier)] = (meta, data, cost, time.time())
+            self.bytes += cost
+            while self.bytes > self.max_bytes:
+                _, (_, _, c, _) = self._items.popitem(last=False)
+                self.bytes -= c
+                self.evictions += 1
+
+    def discard(self, key: str, tier: str):
+        with self._lock:
+            old = self._items.pop((key, tier), None)
+            if old is not None:
+                self.bytes -= old[2]
+
+    def _flush_loop(self, flush_s: float):
+        while True:
+            time.sleep(flush_s)
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+                added = {k: item[3] for k, item in self._items.items()}
+            try:
+                if pending:
+                    self._touch(dict(pending))
+                if added and self._created is not None:
+                    self._invalidate(added, self._created(list(added)))
+            except sqlite3.Error as e:
+                print(f"[tts] falha ao sincronizar o nível em memória com o índice: {e}")
+
+    def _invalidate(self, added: dict, created: dict):
+        with self._lock:
+            for k, t in added.items():
+                c = created.get(k)
+                item = self._items.get(k)
+                # Só descarta a mesma inclusão que foi conferida (t igual).
+                if (c is None or c > t) and item is not None and item[3] == t:
+                    del self._items[k]
+                    self.bytes -= item[2]
+                    self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"max_bytes": self.max_bytes, "bytes": self.bytes, "entries": len(self._items),
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else None}
@@ -0,0 +1,143 @@
+
+# Índice do cache compartilhado entre nós via Redis. Cada nó publica as entradas que
+# grava (dono, URL, tamanho e metadados de áudio); num miss local, o nó consulta o
+# índice e copia os arquivos do dono (ou de um caminho visível no armazenamento
+# compartilhado) em vez de sintetizar de novo.
+#   tts:cache:<tier>:<hash> -> hash {node, url, path, size, meta, updated}
+#   tts:cache:stats         -> hash {<node>:<contador>: n}, repassado em lote e somado em cluster_stats()
+import json, shutil, threading, time, urllib.error, urllib.request
+from collections import Counter
+from pathlib import Path
+from services.tts.cache import atomic_write
+
+ENTRY_TTL_S = 30 * 24 * 3600
+STATS_KEY = "tts:cache:stats"
+
+class ClusterIndex:
+    def __init__(self, host: str, node_id: str, node_url: str, fetch_timeout_s: float = 5.0,
+                 flush_s: float = 5.0):
+        import redis
+        self._redis = redis.Redis(host=host, port=6379, db=0, decode_responses=True,
+                                  socket_timeout=1.0, socket_connect_timeout=1.0)
+        self._errors = (redis.RedisError, OSError)
+        self.node_id = node_id
+        self.node_url = node_url.rstrip("/")
+        self.fetch_timeout_s = fetch_timeout_s
+        self._lock = threading.Lock()
+        self.counters = Counter()
+        self._pending = Counter()
+        threading.Thread(target=self._flush_loop, args=(flush_s,), name="tts-cluster-flush", daemon=True).start()
+
+    def _count(self, name: str):
+        # Contado só em memória: o caminho quente (todo lookup) não espera o Redis.
+        with self._lock:
+            self.counters[name] += 1
+            self._pending[name] += 1
+
+    def _flush_loop(self, flush_s: float):
+        # Repassa os contadores ao Redis em lote, num único pipeline, a cada flush_s.
+        while True:
+            time.sleep(flush_s)
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+            if not pending:
+                continue
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for name, n in pending.items():
+                    pipe.hincrby(STATS_KEY, f"{self.node_id}:{name}", n)
+                pipe.execute()
+            except self._errors:
+                # Redis fora: devolve ao próximo lote em vez de perder a contagem.
+                with self._lock:
+                    self._pending.update(pending)
+
+    def publish(self, key: str, tier: str, path: Path, size: int, meta: dict | None, remote: bool = False):
+        # Melhor esforço: falha no Redis nunca derruba a síntese. Só o dono publica:
+        # uma cópia trazida de outro nó (remote) não toma a entrada, senão a remoção
+        # local da cópia apagaria do índice um arquivo que o dono ainda tem.
+        if remote:
+            return
+        name = f"tts:cache:{tier}:{key}"
+        fields = {"node": self.node_id, "url": self.node_url, "path": str(path), "size": size,
+                  "updated": time.time()}
+        if meta is not None:
+            fields["meta"] = json.dumps(meta, ensure_ascii=False)
+        try:
+            # meta None (ex.: só uma variante foi acrescentada) mantém os metadados já
+            # publicados, e não muda o dono se a entrada for de outro nó.
+            if meta is None and self._redis.hget(name, "node") not in (None, self.node_id):
+                return
+            pipe = self._redis.pipeline()
+            pipe.hset(name, mapping=fields)
+            pipe.expire(name, ENTRY_TTL_S)
+            pipe.execute()
+        except self._errors:
+            self._count("publish_errors")
+
+    def unpublish(self, key: str, tier: str):
+        # Só o dono remove a entrada; cópias em outros nós não a invalidam.
+        name = f"tts:cache:{tier}:{key}"
+        try:
+            if self._redis.hget(name, "node") == self.node_id:
+                self._redis.delete(name)
+        except self._errors:
+            pass
+
+    def record_local(self, hit: bool):
+        self._count("local_hits" if hit else "local_misses")
+
+    def fetch(self, key: str, tier: str, dest_dir: Path, suffixes: tuple[str, ...]) -> dict | None:
+        # Copia os arquivos da entrada para dest_dir; retorna os metadados publicados ou None.
+        try:
+            entry = self._redis.hgetall(f"tts:cache:{tier}:{key}")
+        except self._errors:
+            self._count("lookup_errors")
+            return None
+        if not entry or entry.get("node") == self.node_id:
+            self._count("remote_misses")
+            return None
+        try:
+            for suffix in suffixes:
+                self._copy(entry, key, tier, suffix, dest_dir / f"{key}{suffix}")
+        except (OSError, urllib.error.URLError) as e:
+            print(f"[tts] cópia de {tier}:{key} de {entry.get('node')} falhou: {e}")
+            self._count("remote_errors")
+            return None
+        self._count("remote_hits")
+        return json.loads(entry.get("meta") or "{}")
+
+    def _copy(self, entry: dict, key: str, tier: str, suffix: str, dest: Path):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shared = Path(entry["path"]).with_name(f"{key}{suffix}") if entry.get("path") else None
+        if shared is not None and shared.exists():
+            atomic_write(dest, lambda p: shutil.copyfile(shared, p))
+            return
+        url = f"{entry['url']}/internal/tts/artifacts/{tier}/{key}{suffix}"
+        try:
+            with urllib.request.urlopen(url, timeout=self.fetch_timeout_s) as resp:
+                atomic_write(dest, lambda p: p.write_bytes(resp.read()))
+        except urllib.error.HTTPError as e:
+            # Arquivos opcionais (ex.: picos) podem não existir no dono.
+            if e.code != 404 or suffix == ".wav":
+                raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            local = dict(self.counters)
+        try:
+            raw = self._redis.hgetall(STATS_KEY)
+        except self._errors:
+            raw = {}
+        totals, nodes = Counter(), set()
+        for field, n in raw.items():
+            node, _, name = field.rpartition(":")
+            nodes.add(node)
+            totals[name] += int(n)
+        lookups = totals["local_hits"] + totals["local_misses"]
+        served = totals["local_hits"] + totals["remote_hits"]
+        return {
+            "node_id": self.node_id, "node": local, "cluster": dict(totals), "nodes": sorted(nodes),
+            "local_hit_rate": round(totals["local_hits"] / lookups, 4) if lookups else None,
+            "cluster_hit_rate": round(served / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,163 @@
+
+# Onde a inferência roda: no próprio processo (LocalEngine) ou num pool de processos
+# dedicados (ProcessEngine), cada um com sua fatia de núcleos e seus modelos residentes.
+import multiprocessing as mp
+import os, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from services.tts.backends import load_model
+from services.tts.g2p import g2p_stats
+from services.tts.inference import infer_batch
+from services.tts.registry import ModelRegistry
+
+def model_sample_rate(tts) -> int:
+    return getattr(getattr(tts, "synthesizer", None), "output_sample_rate", None) or 22050
+
+class RtfMeter:
+    # Fator de tempo real (tempo de inferência / duração do áudio gerado) do backend.
+    def __init__(self, backend: str):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.items = 0
+        self.audio_s = 0.0
+        self.infer_s = 0.0
+
+    def record(self, results: list, elapsed_s: float):
+        audio_s = sum(r["wav"].size / r["sample_rate"] for r in results)
+        with self._lock:
+            self.items += len(results)
+            self.audio_s += audio_s
+            self.infer_s += elapsed_s
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": self.backend, "items": self.items, "audio_s": round(self.audio_s, 2),
+                    "infer_s": round(self.infer_s, 2),
+                    "rtf": round(self.infer_s / self.audio_s, 4) if self.audio_s else None}
+
+class LocalEngine:
+    def __init__(self, registry: ModelRegistry, threads: int, backend: str = "torch"):
+        self.registry = registry
+        self.threads = threads
+        self.meter = RtfMeter(backend)
+        self.cold_start_ms = None
+
+    def start(self, preload: list[str]):
+        t0 = time.perf_counter()
+        import torch
+        torch.set_num_threads(self.threads)
+        # Carrega os modelos antes de aceitar requisições: nenhuma requisição paga o load.
+        self.registry.preload(preload)
+        self.cold_start_ms = int((time.perf_counter() - t0) * 1000)
+
+    def infer(self, model: str, texts: list[str]) -> list:
+        tts = self.registry.get(model)
+        t0 = time.perf_counter()
+        results = infer_batch(tts, texts)
+        self.meter.record(results, time.perf_counter() - t0)
+        return results
+
+    def sample_rate(self, model: str) -> int:
+        return model_sample_rate(self.registry.get(model, touch=False))
+
+    def stats(self) -> dict:
+        return {"mode": "local", "torch_threads": self.threads, "cold_start_ms": self.cold_start_ms,
+                "inference": self.meter.stats(), "g2p": g2p_stats(),
+                "models": self.registry.stats()}
+
+# Estado de cada processo do pool (preenchido pelo initializer).
+_worker: dict = {}
+
+def _init_worker(counter, processes: int, threads: int, budget_bytes: int, preload: list[str], backend: str):
+    t0 = time.perf_counter()
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    share = max(1, len(cores) // processes) if cores else 0
+    mine = cores[(index * share) % len(cores):][:share] if cores else []
+    if mine:
+        try:
+            os.sched_setaffinity(0, mine)
+        except OSError:
+            pass
+    import torch
+    torch.set_num_threads(threads or max(1, len(mine) or (os.cpu_count() or 1) // processes))
+    torch.set_num_interop_threads(1)
+    registry = ModelRegistry(budget_bytes, loader=partial(load_model, backend=backend))
+    registry.preload(preload)
+    _worker.update(index=index, pid=os.getpid(), cores=mine, torch_threads=torch.get_num_threads(),
+                   cold_start_ms=int((time.perf_counter() - t0) * 1000), registry=registry)
+
+# Intervalo mínimo entre snapshots do estado do processo enviados ao pai.
+DESCRIBE_INTERVAL_S = 5.0
+
+def _infer(model: str, texts: list[str]) -> tuple[list, dict | None]:
+    # O estado do processo (memória, G2P, modelos) volta junto com o resultado, no
+    # máximo a cada DESCRIBE_INTERVAL_S: ler smaps e montar os stats a cada lote
+    # pesaria no caminho da inferência.
+    results = infer_batch(_worker["registry"].get(model), texts)
+    now = time.monotonic()
+    if now - _worker.get("described_at", 0.0) < DESCRIBE_INTERVAL_S:
+        return results, None
+    _worker["described_at"] = now
+    return results, _describe()
+
+def _sample_rate(model: str) -> int:
+    return model_sample_rate(_worker["registry"].get(model, touch=False))
+
+def _describe() -> dict:
+    return ({k: v for k, v in _worker.items() if k not in ("registry", "described_at")}
+            | {"g2p": g2p_stats(), "models": _worker["registry"].stats()})
+
+class ProcessEngine:
+    def __init__(self, processes: int, threads: int, budget_bytes: int, backend: str = "torch"):
+        self.processes = processes
+        self.threads = threads
+        self.budget_bytes = budget_bytes
+        self.backend = backend
+        self.meter = RtfMeter(backend)
+        self._executor: ProcessPoolExecutor | None = None
+        self._rates: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._workers: dict[int, dict] = {}
+
+    def start(self, preload: list[str]):
+        # spawn: os processos não herdam o estado de threads do torch do processo pai.
+        ctx = mp.get_context("spawn")
+        counter = ctx.Value("i", 0)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=ctx, initializer=_init_worker,
+            initargs=(counter, self.processes, self.threads, self.budget_bytes, preload, self.backend))
+        # Uma tarefa por processo força todos a subirem (e carregarem modelos) no startup.
+        futures = [self._executor.submit(_describe) for _ in range(self.processes)]
+        for f in futures:
+            self._update_worker(f.result())
+
+    def _update_worker(self, info: dict):
+        with self._lock:
+            self._workers[info["pid"]] = info | {"updated_at": int(time.time())}
+
+    def infer(self, model: str, texts: list[str]) -> list:
+        # O tempo medido inclui a ida e volta ao processo (serialização do áudio).
+        t0 = time.perf_counter()
+        results, info = self._executor.submit(_infer, model, texts).result()
+        self.meter.record(results, time.perf_counter() - t0)
+        if info is not None:
+            self._update_worker(info)
+        return results
+
+    def sample_rate(self, model: str) -> int:
+        with self._lock:
+            rate = self._rates.get(model)
+        if rate is None:
+            rate = self._executor.submit(_sample_rate, model).result()
+            with self._lock:
+                self._rates[model] = rate
+        return rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            workers = sorted(self._workers.values(), key=lambda w: w["index"])
+        return {"mode": "process", "processes": self.processes, "inference": self.meter.stats(),
+                "workers": workers}
@@ -0,0 +1,19 @@
+
+# Motor de contingência: espeak-ng (formantes, CPU, offline), ordens de grandeza mais
+# barato que o VITS. Qualidade inferior, mas responde em milissegundos quando o motor
+# principal está saturado ou falhando.
+import io, shutil, subprocess
+import numpy as np
+import soundfile as sf
+
+FALLBACK_BIN = "espeak-ng"
+
+def fallback_available() -> bool:
+    return shutil.which(FALLBACK_BIN) is not None
+
+def synth_fallback(text: str, voice: str = "pt-br", wpm: int = 160) -> tuple[np.ndarray, int]:
+    # Texto via stdin (sem limite de argumento nem interpretação pelo shell); WAV na stdout.
+    proc = subprocess.run([FALLBACK_BIN, "-v", voice, "-s", str(wpm), "--stdin", "--stdout"],
+                          input=text.encode("utf-8"), capture_output=True, check=True, timeout=60)
+    wav, sr = sf.read(io.BytesIO(proc.stdout), dtype="float32")
+    return wav.reshape(-1) if wav.ndim == 1 else wav.mean(axis=1), sr
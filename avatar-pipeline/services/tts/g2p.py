@@ -0,0 +1,143 @@
+
+# Cache de fonemização por palavra na frente do fonemizador do tokenizer Coqui.
+# O vocabulário dos cursos (termos de segurança, códigos de norma, nomes de empresas)
+# se repete muito: cada palavra passa pelo espeak uma única vez e fica num SQLite
+# compartilhado pelos processos. Um léxico de pronúncias (TTS_LEXICON) tem prioridade
+# sobre o fonemizador; o hash dele entra nas chaves do cache de áudio.
+# Limitação: efeitos entre palavras (ex.: sonorização do "s" final antes de vogal)
+# não são reproduzidos, já que cada palavra é fonemizada isoladamente.
+import hashlib, json, os, re, sqlite3, threading, time
+from collections import Counter
+from pathlib import Path
+
+G2P_ENABLED = os.getenv("TTS_G2P", "1") == "1"
+# Vazio = cache só em memória, por processo.
+G2P_DB = os.getenv("TTS_G2P_CACHE", "/data/tts_cache/g2p.sqlite3")
+LEXICON_PATH = Path(os.getenv("TTS_LEXICON", "/app/config/lexicon_ptbr.json"))
+# Incrementar quando a forma de juntar palavras/pontuação mudar: invalida o SQLite.
+G2P_VERSION = 1
+
+_TOKEN_RE = re.compile(r"(\w+(?:[-']\w+)*)|(\s+)|([^\w\s]+)")
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+def _count(**kw):
+    with _stats_lock:
+        _stats.update(kw)
+
+def load_lexicon(path: Path = LEXICON_PATH) -> dict[str, str]:
+    # {"palavra": "fonemas"}; chaves iniciadas por "_" são comentários.
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    return {k.lower(): v for k, v in raw.items() if not k.startswith("_")}
+
+def lexicon_hash(lexicon: dict[str, str]) -> str | None:
+    if not lexicon:
+        return None
+    return hashlib.sha1(json.dumps(lexicon, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+class CachedPhonemizer:
+    # Mesma interface do fonemizador Coqui (phonemize(text, separator, language));
+    # demais atributos são repassados ao original.
+    def __init__(self, inner, lexicon: dict[str, str], db_path: str, namespace: str):
+        self.inner = inner
+        self.lexicon = lexicon
+        self.namespace = f"{namespace}|v{G2P_VERSION}"
+        self._mem: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS g2p (ns TEXT NOT NULL, word TEXT NOT NULL, "
+                             "phonemes TEXT NOT NULL, PRIMARY KEY (ns, word))")
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def phonemize(self, text: str, separator: str = "|", language: str | None = None) -> str:
+        tokens = [(m.group(1), m.group(2), m.group(3)) for m in _TOKEN_RE.finditer(text)]
+        words = {w.lower() for w, _, _ in tokens if w}
+        ns = f"{self.namespace}|{separator}|{language or getattr(self.inner, 'language', '')}"
+        found = self._lookup(words, ns)
+        missing = sorted(words - found.keys())
+        if missing:
+            found.update(self._phonemize_missing(missing, ns, separator, language))
+        _count(calls=1, words=sum(1 for w, _, _ in tokens if w))
+        out = []
+        for word, space, punct in tokens:
+            out.append(found[word.lower()] if word else " " if space else punct)
+        return "".join(out).strip()
+
+    def _lookup(self, words: set[str], ns: str) -> dict[str, str]:
+        found, lex, mem, disk = {}, 0, 0, 0
+        pending = []
+        with self._lock:
+            for w in words:
+                if w in self.lexicon:
+                    found[w] = self.lexicon[w]
+                    lex += 1
+                elif (ns, w) in self._mem:
+                    found[w] = self._mem[(ns, w)]
+                    mem += 1
+                else:
+                    pending.append(w)
+            if pending and self._db is not None:
+                marks = ",".join("?" * len(pending))
+                for w, ph in self._db.execute(f"SELECT word, phonemes FROM g2p WHERE ns=? AND word IN ({marks})",
+                                              [ns, *pending]):
+                    found[w] = self._mem[(ns, w)] = ph
+                    disk += 1
+        _count(lexicon_hits=lex, memory_hits=mem, disk_hits=disk)
+        return found
+
+    def _phonemize_missing(self, words: list[str], ns: str, separator: str, language: str | None) -> dict[str, str]:
+        # Uma chamada ao fonemizador para todas as palavras novas; se a contagem de
+        # palavras na saída não bater, fonemiza uma a uma.
+        t0 = time.perf_counter()
+        joined = self.inner.phonemize(" ".join(words), separator=separator, language=language).split()
+        if len(joined) != len(words):
+            joined = [self.inner.phonemize(w, separator=separator, language=language).strip() for w in words]
+        result = dict(zip(words, joined))
+        with self._lock:
+            for w, ph in result.items():
+                self._mem[(ns, w)] = ph
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO g2p (ns, word, phonemes) VALUES (?, ?, ?)",
+                                     [(ns, w, ph) for w, ph in result.items()])
+        _count(misses=len(words), miss_ms=(time.perf_counter() - t0) * 1000)
+        return result
+
+def install_g2p(tts, name: str, lexicon: dict[str, str] | None = None) -> bool:
+    # Envolve o fonemizador do modelo (se ele usa fonemas); True se instalado.
+    model = getattr(getattr(tts, "synthesizer", None), "tts_model", None)
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None or not getattr(tokenizer, "use_phonemes", False) or tokenizer.phonemizer is None:
+        return False
+    if isinstance(tokenizer.phonemizer, CachedPhonemizer):
+        return True
+    inner = tokenizer.phonemizer
+    tokenizer.phonemizer = CachedPhonemizer(inner, load_lexicon() if lexicon is None else lexicon,
+                                            G2P_DB, f"{name}|{type(inner).__name__}")
+    return True
+
+def g2p_stats() -> dict:
+    with _stats_lock:
+        s = dict(_stats)
+    hits = s.get("lexicon_hits", 0) + s.get("memory_hits", 0) + s.get("disk_hits", 0)
+    lookups = hits + s.get("misses", 0)
+    miss_ms = s.get("miss_ms", 0.0) / s["misses"] if s.get("misses") else 0.0
+    # Economia estimada: cada hit evitaria, em média, o custo por palavra de um miss.
+    saved_ms = hits * miss_ms
+    return {
+        "calls": s.get("calls", 0), "words": s.get("words", 0),
+        "lexicon_hits": s.get("lexicon_hits", 0), "memory_hits": s.get("memory_hits", 0),
+        "disk_hits": s.get("disk_hits", 0), "misses": s.get("misses", 0),
+        "hit_rate": round(hits / lookups, 4) if lookups else None,
+        "miss_ms_per_word": round(miss_ms, 3),
+        "saved_ms": round(saved_ms, 1),
+        "saved_ms_per_call": round(saved_ms / s["calls"], 3) if s.get("calls") else 0.0,
+    }
@@ -0,0 +1,97 @@
+
+# Inferência do modelo Coqui em lote (VITS), com fallback para chamadas individuais.
+# Cada resultado é {"wav", "sample_rate", "words", "phonemes"}; os timings vêm das
+# durações previstas pelo próprio modelo, sem alinhamento forçado posterior.
+import numpy as np
+from services.tts.text import approx_word_timings
+
+def supports_batch(tts) -> bool:
+    model = getattr(getattr(tts, "synthesizer", None), "tts_model", None)
+    return (type(model).__name__ == "Vits" and hasattr(model, "tokenizer")
+            and getattr(model, "num_speakers", 0) <= 1)
+
+def _sample_rate(tts) -> int:
+    return getattr(getattr(tts, "synthesizer", None), "output_sample_rate", None) or 22050
+
+def _approx(text: str, wav: np.ndarray, sr: int) -> dict:
+    return {"wav": wav, "sample_rate": sr, "phonemes": [],
+            "words": approx_word_timings(text, wav.size / sr * 1000)}
+
+def infer_serial(tts, texts: list[str]) -> list[dict]:
+    sr = _sample_rate(tts)
+    wavs = [np.asarray(tts.tts(t, split_sentences=False), dtype=np.float32) for t in texts]
+    return [_approx(t, w, sr) for t, w in zip(texts, wavs)]
+
+def infer_onnx(tts, texts: list[str]) -> list[dict]:
+    # ONNX Runtime (backends.py): um item por chamada, pois o grafo exportado não
+    # devolve a máscara de saída para cortar o padding de um lote.
+    model = tts.synthesizer.tts_model
+    sr = _sample_rate(tts)
+    results = []
+    for text in texts:
+        ids = np.asarray([model.tokenizer.text_to_ids(text)], dtype=np.int64)
+        wav = np.asarray(model.inference_onnx(ids), dtype=np.float32).reshape(-1)
+        results.append(_approx(text, wav, sr))
+    return results
+
+def token_timings(model, text: str, ids: list[int], durations: np.ndarray, sr: int) -> tuple[list, list]:
+    # durations: frames de espectrograma por token. Tokens entre espaços formam uma
+    # palavra; se a contagem não bater com o texto (cleaners/fonemizador juntaram ou
+    # separaram palavras), cai para o timing aproximado.
+    chars = model.tokenizer.characters
+    ms = durations.astype(np.float64) * model.config.audio.hop_length / sr * 1000
+    ends = np.cumsum(ms)
+    starts = ends - ms
+    skip = {getattr(chars, a, None) for a in ("blank", "pad", "bos", "eos")} - {None}
+    symbols = [chars.id_to_char(int(i)) for i in ids]
+    phonemes, groups, cur = [], [], []
+    for sym, a, b in zip(symbols, starts, ends):
+        if sym in skip:
+            continue
+        if sym == " ":
+            if cur:
+                groups.append(cur)
+            cur = []
+            continue
+        phonemes.append({"p": sym, "start_ms": int(round(a)), "end_ms": int(round(b))})
+        if any(c.isalnum() for c in sym):
+            cur.append((a, b))
+    if cur:
+        groups.append(cur)
+    words = text.split()
+    if len(groups) != len(words):
+        return approx_word_timings(text, float(ends[-1]) if len(ends) else 0.0), phonemes
+    return [{"word": w, "start_ms": int(round(g[0][0])), "end_ms": int(round(g[-1][1]))}
+            for w, g in zip(words, groups)], phonemes
+
+def infer_batch(tts, texts: list[str]) -> list[dict]:
+    # Lote com padding: os ids de cada texto ocupam o início da linha e x_lengths
+    # informa o tamanho real; a saída de cada item é cortada pela máscara y_mask.
+    if not supports_batch(tts):
+        return infer_serial(tts, texts)
+    if getattr(tts.synthesizer.tts_model, "onnx_sess", None) is not None:
+        return infer_onnx(tts, texts)
+    import torch
+    model = tts.synthesizer.tts_model
+    sr = _sample_rate(tts)
+    ids = [model.tokenizer.text_to_ids(t) for t in texts]
+    lengths = torch.tensor([len(i) for i in ids], dtype=torch.long)
+    x = torch.zeros(len(ids), int(lengths.max()), dtype=torch.long)
+    for i, seq in enumerate(ids):
+        x[i, :len(seq)] = torch.tensor(seq, dtype=torch.long)
+    device = next(model.parameters()).device
+    try:
+        with torch.inference_mode():
+            out = model.inference(x.to(device), aux_input={"x_lengths": lengths.to(device)})
+    except (RuntimeError, KeyError, TypeError):
+        # Modelo/versão sem suporte a lote: mantém o resultado correto, só perde o ganho.
+        return infer_serial(tts, texts)
+    hop = model.config.audio.hop_length
+    n_samples = (out["y_mask"].sum(dim=(1, 2)) * hop).long().tolist()
+    wavs = out["model_outputs"][:, 0].float().cpu().numpy()
+    durations = out["durations"].reshape(len(texts), -1).float().cpu().numpy()
+    results = []
+    for i, (text, n) in enumerate(zip(texts, n_samples)):
+        words, phonemes = token_timings(model, text, ids[i], durations[i, :len(ids[i])], sr)
+        results.append({"wav": wavs[i, :n], "sample_rate": sr, "words": words, "phonemes": phonemes})
+    return results
@@ -0,0 +1,267 @@
+
+# Normalização determinística de texto pt-BR antes do hash e da síntese.
+# Mesma entrada falada => mesmo texto normalizado => mesma chave de cache.
+import re, unicodedata
+
+# Incrementar quando as regras mudarem: entra na chave do cache.
+NORMALIZER_VERSION = 4
+
+UNITS = ["", "um", "dois", "três", "quatro", "cinco", "seis", "sete", "oito", "nove",
+         "dez", "onze", "doze", "treze", "quatorze", "quinze", "dezesseis", "dezessete",
+         "dezoito", "dezenove"]
+TENS = ["", "", "vinte", "trinta", "quarenta", "cinquenta", "sessenta", "setenta",
+        "oitenta", "noventa"]
+HUNDREDS = ["", "cento", "duzentos", "trezentos", "quatrocentos", "quinhentos",
+            "seiscentos", "setecentos", "oitocentos", "novecentos"]
+SCALES = [("", ""), ("mil", "mil"), ("milhão", "milhões"), ("bilhão", "bilhões"),
+          ("trilhão", "trilhões")]
+FEMININE = {"um": "uma", "dois": "duas", "duzentos": "duzentas", "trezentos": "trezentas",
+            "quatrocentos": "quatrocentas", "quinhentos": "quinhentas",
+            "seiscentos": "seiscentas", "setecentos": "setecentas", "oitocentos": "oitocentas",
+            "novecentos": "novecentas"}
+ORDINALS = {1: "primeiro", 2: "segundo", 3: "terceiro", 4: "quarto", 5: "quinto",
+            6: "sexto", 7: "sétimo", 8: "oitavo", 9: "nono", 10: "décimo"}
+ORDINAL_TENS = ["", "décimo", "vigésimo", "trigésimo", "quadragésimo", "quinquagésimo",
+                "sexagésimo", "septuagésimo", "octogésimo", "nonagésimo"]
+ORDINAL_HUNDREDS = ["", "centésimo", "ducentésimo", "trecentésimo", "quadringentésimo",
+                    "quingentésimo", "sexcentésimo", "septingentésimo", "octingentésimo",
+                    "noningentésimo"]
+MONTHS = ["janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho", "agosto",
+          "setembro", "outubro", "novembro", "dezembro"]
+LETTERS = {"a": "á", "b": "bê", "c": "cê", "d": "dê", "e": "é", "f": "efe", "g": "gê",
+           "h": "agá", "i": "i", "j": "jota", "k": "cá", "l": "ele", "m": "eme", "n": "ene",
+           "o": "ó", "p": "pê", "q": "quê", "r": "erre", "s": "esse", "t": "tê", "u": "u",
+           "v": "vê", "w": "dáblio", "x": "xis", "y": "ípsilon", "z": "zê"}
+
+# Siglas de SST lidas como palavra (as demais siglas em maiúsculas são soletradas).
+ACRONYMS_AS_WORD = {"CIPA", "SESMT", "PCMSO", "PGR", "LTCAT", "ASO", "CAT", "EPI", "EPC",
+                    "CLT", "INSS", "ABNT", "SUS", "ANVISA"}
+# Normas com código: "NR-10", "nr 10" e "NR10" viram o mesmo texto ("ene erre dez").
+NORM_PREFIXES = {"NR": "ene erre", "NBR": "ene bê erre", "ISO": "iso", "IEC": "i é cê",
+                 "NHO": "ene agá ó"}
+
+# (símbolo, singular, plural, gênero feminino?)
+UNIT_WORDS = {
+    "km/h": ("quilômetro por hora", "quilômetros por hora", False),
+    "m/s": ("metro por segundo", "metros por segundo", False),
+    "m²": ("metro quadrado", "metros quadrados", False),
+    "m2": ("metro quadrado", "metros quadrados", False),
+    "m³": ("metro cúbico", "metros cúbicos", False),
+    "m3": ("metro cúbico", "metros cúbicos", False),
+    "°C": ("grau Celsius", "graus Celsius", False),
+    "ºC": ("grau Celsius", "graus Celsius", False),
+    "kg": ("quilo", "quilos", False),
+    "km": ("quilômetro", "quilômetros", False),
+    "cm": ("centímetro", "centímetros", False),
+    "mm": ("milímetro", "milímetros", False),
+    "kV": ("quilovolt", "quilovolts", False),
+    "kW": ("quilowatt", "quilowatts", False),
+    "kWh": ("quilowatt-hora", "quilowatts-hora", False),
+    "mA": ("miliampere", "miliamperes", False),
+    "dB": ("decibel", "decibéis", False),
+    "dBA": ("decibel A", "decibéis A", False),
+    "dB(A)": ("decibel A", "decibéis A", False),
+    "lux": ("lux", "lux", False),
+    "ppm": ("parte por milhão", "partes por milhão", True),
+    "min": ("minuto", "minutos", False),
+    "h": ("hora", "horas", True),
+    "s": ("segundo", "segundos", False),
+    "m": ("metro", "metros", False),
+    "g": ("grama", "gramas", False),
+    "l": ("litro", "litros", False),
+    "L": ("litro", "litros", False),
+    "V": ("volt", "volts", False),
+    "A": ("ampere", "amperes", False),
+    "W": ("watt", "watts", False),
+    "Hz": ("hertz", "hertz", False),
+    "%": ("por cento", "por cento", False),
+}
+
+_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "«": '"', "»": '"', "‘": "'",
+                         "’": "'", "´": "'", "`": "'", "–": "-", "—": "-", "\u00a0": " "})
+
+def _below_thousand(n: int) -> list[str]:
+    if n == 100:
+        return ["cem"]
+    words = []
+    h, rest = divmod(n, 100)
+    if h:
+        words.append(HUNDREDS[h])
+    if rest:
+        if rest < 20:
+            words.append(UNITS[rest])
+        else:
+            t, u = divmod(rest, 10)
+            words.append(TENS[t] + (f" e {UNITS[u]}" if u else ""))
+    return [" e ".join(words)] if words else []
+
+def number_to_words(n: int, feminine: bool = False) -> str:
+    if n < 0:
+        return "menos " + number_to_words(-n, feminine)
+    if n == 0:
+        return "zero"
+    if n >= 1000 ** len(SCALES):
+        return " ".join(UNITS[int(d)] if d != "0" else "zero" for d in str(n))
+    groups = []
+    while n:
+        n, g = divmod(n, 1000)
+        groups.append(g)
+    parts = []
+    for i in range(len(groups) - 1, -1, -1):
+        g = groups[i]
+        if not g:
+            continue
+        if i == 1 and g == 1:
+            words = "mil"
+        else:
+            words = _below_thousand(g)[0]
+            if feminine and i <= 1:
+                words = " ".join(FEMININE.get(w, w) for w in words.split())
+            if i:
+                words += " " + SCALES[i][0 if g == 1 else 1]
+        parts.append((g, words))
+    # "mil e duzentos", mas "mil duzentos e trinta": o "e" só entra antes do último
+    # grupo quando ele é < 100 ou uma centena redonda.
+    out = parts[0][1]
+    for g, words in parts[1:]:
+        joiner = " e " if g < 100 or g % 100 == 0 else " "
+        out += joiner + words
+    return out
+
+def ordinal_to_words(n: int, feminine: bool = False) -> str:
+    # 1..999: "décimo primeiro", "centésimo vigésimo terceiro".
+    h, rest = divmod(n, 100)
+    t, u = divmod(rest, 10)
+    words = [w for w in (ORDINAL_HUNDREDS[h], ORDINAL_TENS[t], ORDINALS.get(u, "")) if w]
+    return " ".join(w[:-1] + "a" if feminine else w for w in words)
+
+def _decimal_to_words(int_part: str, frac: str, feminine: bool = False) -> str:
+    words = number_to_words(int(int_part), feminine)
+    # "2,00" é "dois": casas decimais só de zeros não são lidas.
+    if frac.strip("0"):
+        frac_words = (" ".join("zero" for _ in frac[:len(frac) - len(frac.lstrip("0"))])
+                      + " " + number_to_words(int(frac), feminine))
+        words += " vírgula " + frac_words.strip()
+    return words
+
+def _spell(acronym: str) -> str:
+    return " ".join(LETTERS.get(c, c) for c in acronym.lower())
+
+def _money(m: re.Match) -> str:
+    reais = int(m.group(1).replace(".", ""))
+    cents = int((m.group(2) or "0").ljust(2, "0")[:2])
+    parts = []
+    if reais or not cents:
+        parts.append(number_to_words(reais) + (" de" if reais >= 1_000_000 and reais % 1_000_000 == 0 else "")
+                     + (" real" if reais == 1 else " reais"))
+    if cents:
+        parts.append(number_to_words(cents) + (" centavo" if cents == 1 else " centavos"))
+    return " e ".join(parts)
+
+def _fraction(n: int, den: int) -> str | None:
+    if den == 2:
+        word = "meio"
+    elif den == 3:
+        word = "terço"
+    elif 4 <= den <= 10:
+        word = ORDINALS[den]
+    else:
+        return None
+    return f"{number_to_words(n)} {word}{'s' if n > 1 else ''}"
+
+def _date(m: re.Match) -> str:
+    context, d, mo, y = m.group(1), int(m.group(2)), int(m.group(3)), m.group(4)
+    # "1/2 xícara" é fração: dia/mês sem ano só vira data com contexto ("dia 5/3").
+    if not y and not context:
+        return _fraction(d, mo) or m.group(0)
+    if not (1 <= d <= 31 and 1 <= mo <= 12):
+        return m.group(0)
+    day = "primeiro" if d == 1 else number_to_words(d)
+    out = f"{context or ''}{day} de {MONTHS[mo - 1]}"
+    if y:
+        year = int(y) + (2000 if len(y) == 2 else 0)
+        out += f" de {number_to_words(year)}"
+    return out
+
+def _norm_code(m: re.Match) -> str:
+    prefix = m.group(1).upper()
+    number = int(m.group(2))
+    return f"{NORM_PREFIXES[prefix]} {number_to_words(number)}"
+
+def _ordinal(m: re.Match) -> str:
+    n = int(m.group(1))
+    if not n:
+        return m.group(1)
+    return ordinal_to_words(n, feminine=m.group(2) == "ª")
+
+def _time(m: re.Match) -> str:
+    h, mins = int(m.group(1)), int(m.group(2) or m.group(3) or 0)
+    if h > 23 or mins > 59:
+        return m.group(0)
+    out = number_to_words(h, feminine=True) + (" hora" if h == 1 else " horas")
+    if mins:
+        out += " e " + number_to_words(mins) + (" minuto" if mins == 1 else " minutos")
+    return out
+
+def _unit(m: re.Match) -> str:
+    int_part, frac, unit = m.group(1).replace(".", ""), m.group(2) or "", next(u for u in m.groups()[2:] if u)
+    singular, plural, feminine = UNIT_WORDS[unit]
+    value = _decimal_to_words(int_part, frac, feminine)
+    one = int(int_part) == 1 and not frac.strip("0")
+    return f"{value} {singular if one else plural}"
+
+def _percent_or_number(m: re.Match) -> str:
+    return _decimal_to_words(m.group(1).replace(".", ""), m.group(2) or "")
+
+def _acronym(m: re.Match) -> str:
+    # Siglas curtas ou sem vogais são soletradas; palavras em caixa alta são lidas.
+    word = m.group(0)
+    if word.upper() in ACRONYMS_AS_WORD:
+        return word.capitalize()
+    if len(word) <= 3 or not re.search(r"[AEIOU]", word):
+        return _spell(word)
+    return word.capitalize()
+
+_NORM_RE = re.compile(r"\b(" + "|".join(NORM_PREFIXES) + r")\s*[-–]?\s*(\d{1,5})\b", re.I)
+_MONEY_RE = re.compile(r"R\$\s*(\d{1,3}(?:\.\d{3})*|\d+)(?:,(\d{1,2}))?")
+# Só palavras que pedem data: "em 2/3 dos casos" e "entre 1/4 e 1/2" são frações.
+_DATE_RE = re.compile(r"\b((?:dias?|até|desde|a partir de)\s+)?"
+                      r"(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?\b", re.I)
+_ORDINAL_RE = re.compile(r"\b(\d{1,3})([ºª])(?!C\b)")  # "20ºC" é temperatura
+_TIME_RE = re.compile(r"\b(\d{1,2})(?:h(\d{2})?|:(\d{2}))\b")
+# Inteiro com ou sem separador de milhar e decimal com vírgula (ou ponto, "1.5").
+_NUM = r"(\d{1,3}(?:\.\d{3})+|\d+)(?:[,.](\d+))?"
+# Unidades de uma letra (h, m, A, V...) são ambíguas quando separadas do número:
+# "Capítulo 3 A seguir" não é "três amperes". Separadas, as minúsculas só valem antes
+# de palavra minúscula, pontuação ou fim ("2,00 m de altura"); as maiúsculas só antes
+# de pontuação, fim ou conectivo ("10 A de corrente").
+_LETTER_UNITS = [u for u in UNIT_WORDS if len(u) == 1 and u.isalpha()]
+_END = r"\s*(?:[,.;:!?)]|$)"
+_UNIT_RE = re.compile(
+    _NUM + r"(?:\s*("
+    + "|".join(re.escape(u) for u in sorted(UNIT_WORDS, key=len, reverse=True) if u not in _LETTER_UNITS)
+    + r")|(" + "|".join(_LETTER_UNITS) + r")"
+    + r"|\s+(" + "|".join(u for u in _LETTER_UNITS if u.islower())
+    + r")(?=\s+[a-záàâãéêíóôõúç]|" + _END + r")"
+    + r"|\s+(" + "|".join(u for u in _LETTER_UNITS if u.isupper())
+    + r")(?=" + _END + r"|\s+(?:de|e|ou|em|por)\b))(?![\w²³])")
+_NUMBER_RE = re.compile(_NUM)
+_KNOWN_ACRONYM_RE = re.compile(r"\b(" + "|".join(ACRONYMS_AS_WORD) + r")\b", re.I)
+_ACRONYM_RE = re.compile(r"\b[A-Z]{2,8}\b")
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFC", text).translate(_QUOTES)
+    text = " ".join(text.split())
+    text = _NORM_RE.sub(_norm_code, text)
+    text = _MONEY_RE.sub(_money, text)
+    text = _DATE_RE.sub(_date, text)
+    text = _ORDINAL_RE.sub(_ordinal, text)
+    text = _TIME_RE.sub(_time, text)
+    text = _UNIT_RE.sub(_unit, text)
+    text = _NUMBER_RE.sub(_percent_or_number, text)
+    text = _KNOWN_ACRONYM_RE.sub(lambda m: m.group(0).capitalize(), text)
+    text = _ACRONYM_RE.sub(_acronym, text)
+    # Pontuação repetida e espaços antes de pontuação.
+    text = re.sub(r"([!?.])\1+", r"\1", text)
+    text = re.sub(r"\s+([,.;:!?])", r"\1", text)
+    return " ".join(text.split())
@@ -0,0 +1,58 @@
+
+# Pirâmide de picos min/max para desenhar a forma de onda no editor sem baixar o WAV.
+# Nível 0 tem um par (min, max) a cada BASE_SAMPLES amostras; cada nível seguinte
+# agrupa FACTOR pares do anterior. Formato binário (little-endian):
+#   b"PKS1" | sample_rate u32 | samples u32 | níveis u16 |
+#   por nível: samples_per_peak u32 | n u32 | n pares (min, max) int8
+import struct
+import numpy as np
+
+MAGIC = b"PKS1"
+PEAKS_VERSION = 1
+BASE_SAMPLES = 256
+FACTOR = 4
+LEVELS = 4
+
+def peak_pyramid(wav, base: int = BASE_SAMPLES, factor: int = FACTOR, levels: int = LEVELS) -> list:
+    # [(samples_per_peak, mins, maxs)], do nível mais fino ao mais grosso.
+    y = np.asarray(wav, dtype=np.float32).reshape(-1)
+    n = max(1, -(-y.size // base))
+    padded = np.zeros(n * base, dtype=np.float32)
+    padded[:y.size] = y
+    frames = padded.reshape(n, base)
+    mins, maxs = frames.min(axis=1), frames.max(axis=1)
+    out = [(base, mins, maxs)]
+    for _ in range(levels - 1):
+        if mins.size <= 1:
+            break
+        m = -(-mins.size // factor)
+        pad = m * factor - mins.size
+        mins = np.pad(mins, (0, pad), constant_values=0).reshape(m, factor).min(axis=1)
+        maxs = np.pad(maxs, (0, pad), constant_values=0).reshape(m, factor).max(axis=1)
+        out.append((out[-1][0] * factor, mins, maxs))
+    return out
+
+def _q8(x: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(x * 127), -127, 127).astype(np.int8)
+
+def encode_peaks(wav, sr: int) -> bytes:
+    pyramid = peak_pyramid(wav)
+    parts = [MAGIC, struct.pack("<IIH", sr, int(np.asarray(wav).size), len(pyramid))]
+    for spp, mins, maxs in pyramid:
+        pairs = np.empty(mins.size * 2, dtype=np.int8)
+        pairs[0::2], pairs[1::2] = _q8(mins), _q8(maxs)
+        parts += [struct.pack("<II", spp, mins.size), pairs.tobytes()]
+    return b"".join(parts)
+
+def decode_peaks(data: bytes) -> dict:
+    if data[:4] != MAGIC:
+        raise ValueError("arquivo de picos inválido")
+    sr, samples, n_levels = struct.unpack_from("<IIH", data, 4)
+    pos, levels = 14, []
+    for _ in range(n_levels):
+        spp, n = struct.unpack_from("<II", data, pos)
+        pos += 8
+        pairs = np.frombuffer(data, dtype=np.int8, count=2 * n, offset=pos)
+        pos += 2 * n
+        levels.append({"samples_per_peak": spp, "min": pairs[0::2].tolist(), "max": pairs[1::2].tolist()})
+    return {"sample_rate": sr, "samples": samples, "levels": levels}
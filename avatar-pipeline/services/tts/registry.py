@@ -0,0 +1,140 @@
+
+# Registro de modelos Coqui residentes no processo.
+# Carrega cada modelo uma única vez e mantém os mais usados em memória,
+# descartando o menos recente (LRU) quando o orçamento de memória estoura.
+import gc, os, threading, time
+from collections import OrderedDict
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def memory_breakdown() -> dict:
+    # RSS separado em compartilhado (ex.: pesos em mmap, contados uma vez no nó) e
+    # privado; PSS divide as páginas compartilhadas entre os processos que as usam.
+    fields = {"Rss": "rss_bytes", "Pss": "pss_bytes", "Shared_Clean": "shared_bytes",
+              "Private_Clean": "private_bytes", "Private_Dirty": "private_bytes"}
+    out = dict.fromkeys(fields.values(), 0)
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in fields:
+                    out[fields[name]] += int(rest.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        out["rss_bytes"] = rss_bytes()
+    return out
+
+def model_bytes(tts) -> int:
+    # Tamanho dos pesos (parâmetros + buffers) do modelo torch carregado.
+    model = getattr(getattr(tts, "synthesizer", None), "tts_model", None)
+    if model is None:
+        return 0
+    total = 0
+    for t in list(model.parameters()) + list(model.buffers()):
+        total += t.numel() * t.element_size()
+    return total
+
+class ModelEntry:
+    def __init__(self, name: str, tts, load_ms: int, resident_bytes: int):
+        self.name = name
+        self.tts = tts
+        self.load_ms = load_ms
+        self.resident_bytes = resident_bytes
+        self.loaded_at = time.time()
+        self.hits = 0
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "load_ms": self.load_ms,
+            "resident_bytes": self.resident_bytes,
+            "hits": self.hits,
+            "loaded_at": int(self.loaded_at),
+            "mmap_weights": getattr(self.tts, "mmap_weights", False),
+            "g2p_cache": getattr(self.tts, "g2p_cache", False),
+        }
+
+class ModelRegistry:
+    def __init__(self, budget_bytes: int, loader=None):
+        self.budget_bytes = budget_bytes
+        self._loader = loader
+        self._models: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def _load(self, name: str):
+        if self._loader is not None:
+            return self._loader(name)
+        from TTS.api import TTS
+        return TTS(name)
+
+    def get(self, name: str, touch: bool = True):
+        # touch=False: consulta de metadados (ex.: sample rate), sem contar hit nem
+        # renovar o LRU; ainda carrega o modelo se ele não estiver residente.
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                if touch:
+                    entry.hits += 1
+                    self._models.move_to_end(name)
+                return entry.tts
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Carregamento fora do lock global: outros modelos continuam atendendo.
+        with load_lock:
+            with self._lock:
+                entry = self._models.get(name)
+                if entry is not None:
+                    if touch:
+                        entry.hits += 1
+                        self._models.move_to_end(name)
+                    return entry.tts
+            rss0 = rss_bytes()
+            t0 = time.time()
+            tts = self._load(name)
+            load_ms = int((time.time() - t0) * 1000)
+            resident = model_bytes(tts) or max(rss_bytes() - rss0, 0)
+            entry = ModelEntry(name, tts, load_ms, resident)
+            with self._lock:
+                self._models[name] = entry
+                self.loads += 1
+                self._evict(keep=name)
+            return tts
+
+    def _evict(self, keep: str):
+        # Chamado com self._lock adquirido.
+        evicted = False
+        while len(self._models) > 1 and self.resident_bytes() > self.budget_bytes:
+            name = next(iter(self._models))
+            if name == keep:
+                break
+            del self._models[name]
+            self.evictions += 1
+            evicted = True
+        if evicted:
+            gc.collect()
+
+    def preload(self, names: list[str]):
+        for name in names:
+            self.get(name)
+
+    def resident_bytes(self) -> int:
+        return sum(e.resident_bytes for e in self._models.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "resident_bytes": self.resident_bytes(),
+                "process_rss_bytes": rss_bytes(),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "memory": memory_breakdown(),
+                "models": [e.stats() for e in reversed(self._models.values())],
+            }
@@ -0,0 +1,88 @@
+
+# Segmentação de texto pt-BR para síntese em partes.
+import re
+
+# Abreviações comuns que terminam em ponto mas não encerram a frase.
+ABBREVIATIONS = {
+    "sr", "sra", "srs", "sras", "dr", "dra", "drs", "prof", "profa", "eng", "enga",
+    "art", "arts", "inc", "cap", "pág", "pag", "fig", "ex", "obs", "aprox",
+    "nº", "vol", "ltda", "cia", "av", "tel",
+}
+
+# Candidato a fim de frase: pontuação final seguida de espaço.
+_SENTENCE_END = re.compile(r'([.!?…]+["”»\')\]]*)\s+')
+_CLAUSE_END = re.compile(r'([;:,—–]+)\s+')
+_WORD_BEFORE = re.compile(r"([\wº]+)\.+$")
+
+def _is_abbreviation(head: str) -> bool:
+    m = _WORD_BEFORE.search(head)
+    if not m:
+        return False
+    word = m.group(1).lower()
+    # Iniciais isoladas ("J. Silva") também não encerram frase.
+    return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+def split_sentences(text: str) -> list[str]:
+    text = " ".join(text.split())
+    sentences, start = [], 0
+    for m in _SENTENCE_END.finditer(text):
+        head = text[start:m.end(1)]
+        if m.group(1).startswith(".") and _is_abbreviation(head):
+            continue
+        sentences.append(head.strip())
+        start = m.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return [s for s in sentences if s]
+
+def _split_long(sentence: str, max_chars: int) -> list[str]:
+    if len(sentence) <= max_chars:
+        return [sentence]
+    # Primeiro tenta quebrar em orações (; : , —), depois em espaços.
+    parts, start = [], 0
+    for m in _CLAUSE_END.finditer(sentence):
+        parts.append(sentence[start:m.end(1)])
+        start = m.end()
+    parts.append(sentence[start:])
+    out, cur = [], ""
+    for part in parts:
+        cand = f"{cur} {part}".strip()
+        if len(cand) <= max_chars:
+            cur = cand
+            continue
+        if cur:
+            out.append(cur)
+        while len(part) > max_chars:
+            cut = part.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            out.append(part[:cut].strip())
+            part = part[cut:].strip()
+        cur = part
+    if cur:
+        out.append(cur)
+    return out
+
+def split_chunks(text: str, max_chars: int = 250) -> list[str]:
+    # Frases inteiras sempre que possível; frases longas são quebradas em orações.
+    chunks = []
+    for sentence in split_sentences(text):
+        chunks.extend(_split_long(sentence, max_chars))
+    return chunks
+
+def approx_word_timings(text: str, duration_ms: float, offset_ms: float = 0.0) -> list[dict]:
+    # Timing aproximado: distribui a duração entre as palavras pelo nº de caracteres.
+    words = text.split()
+    weights = [max(len(w.strip(".,;:!?…\"'()")), 1) for w in words]
+    total = sum(weights) or 1
+    out, t = [], offset_ms
+    for w, n in zip(words, weights):
+        dur = duration_ms * n / total
+        out.append({"word": w, "start_ms": int(round(t)), "end_ms": int(round(t + dur))})
+        t += dur
+    return out
+
+def shift_timings(items: list[dict], offset_ms: float = 0.0, scale: float = 1.0) -> list[dict]:
+    # Reposiciona timings relativos a um trecho: t' = offset + t * scale.
+    return [{**it, "start_ms": int(round(offset_ms + it["start_ms"] * scale)),
+             "end_ms": int(round(offset_ms + it["end_ms"] * scale))} for it in items]
@@ -0,0 +1,33 @@
+
+# Variantes derivadas de uma narração do cache, geradas sob demanda com ffmpeg e
+# guardadas ao lado do WAV (mesmo hash, outro sufixo), sob o mesmo LRU:
+#   "wav@16000" -> PCM reamostrado (<hash>.16000.wav)
+#   "m4a"       -> AAC 192k em M4A (<hash>.m4a), pronto para mux com -c:a copy
+#   "opus"      -> Opus 48k em Ogg (<hash>.opus), para prévia na web
+#   "mp3"       -> MP3 128k (<hash>.mp3)
+import re, subprocess
+from pathlib import Path
+from services.tts.cache import atomic_write
+
+ENCODED = {
+    "m4a": (".m4a", ["-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart", "-f", "ipod"]),
+    "opus": (".opus", ["-c:a", "libopus", "-b:a", "48k", "-f", "ogg"]),
+    "mp3": (".mp3", ["-c:a", "libmp3lame", "-b:a", "128k", "-f", "mp3"]),
+}
+_PCM_RE = re.compile(r"^wav@(\d{4,5})$")
+
+def parse_variant(name: str) -> tuple[str, list[str]]:
+    # (sufixo do arquivo, argumentos de saída do ffmpeg); ValueError se desconhecida.
+    if name in ENCODED:
+        return ENCODED[name]
+    m = _PCM_RE.match(name)
+    if m and 8000 <= int(m.group(1)) <= 48000:
+        rate = m.group(1)
+        return f".{rate}.wav", ["-ar", rate, "-c:a", "pcm_s16le", "-f", "wav"]
+    raise ValueError(f"Variante de áudio desconhecida: {name}")
+
+def transcode(src: Path, dst: Path, args: list[str]):
+    # Escrita atômica: o temporário não tem a extensão final, por isso o -f explícito.
+    atomic_write(dst, lambda p: subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", str(src), "-vn", *args, str(p)],
+        check=True, capture_output=True))
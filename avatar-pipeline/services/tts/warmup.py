@@ -0,0 +1,115 @@
+
+# Pré-aquecimento do cache: sintetiza frases recorrentes (aberturas, avisos de
+# segurança, transições) fora do horário de pico, em ritmo limitado e somente
+# quando não há síntese de usuário em andamento.
+#
+# Pela API do serviço:   POST /internal/tts/warmup {"phrases": [...]} ou {"from_redis": true}
+# Pela linha de comando: python -m services.tts.warmup --phrases config/warmup_phrases.txt
+#                        python -m services.tts.warmup --redis --top 200
+import argparse, json, os, sys, threading, time, urllib.request
+from collections import Counter
+from services.tts.normalize import normalize_text
+from services.tts.text import split_chunks
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+
+def mine_redis(top: int = 200, min_count: int = 2, chunk_chars: int = 250, host: str = REDIS_HOST) -> list[str]:
+    # Frases (já normalizadas e divididas como na síntese) mais frequentes nos jobs.
+    import redis
+    r = redis.Redis(host=host, port=6379, db=0, decode_responses=True)
+    counts = Counter()
+    for key in r.scan_iter("job:*", count=500):
+        try:
+            text = json.loads(r.get(key) or "{}").get("params", {}).get("text")
+        except ValueError:
+            continue
+        if text:
+            counts.update(split_chunks(normalize_text(text), chunk_chars))
+    return [s for s, n in counts.most_common(top) if n >= min_count]
+
+class WarmupJob:
+    def __init__(self, phrases: list[str], rate_per_s: float, is_cached, synth, is_idle):
+        # is_cached(frase) -> bool; synth(frase) sintetiza e grava; is_idle() -> bool.
+        self.phrases = list(dict.fromkeys(p for p in phrases if p.strip()))
+        self.rate_per_s = rate_per_s
+        self._is_cached, self._synth, self._is_idle = is_cached, synth, is_idle
+        self._cancel = threading.Event()
+        self.state = "pending"
+        self.cached_before = 0
+        self.synthesized = 0
+        self.failed = 0
+        self.waited_s = 0.0
+        self.started = self.finished = None
+
+    def start(self):
+        threading.Thread(target=self.run, name="tts-warmup", daemon=True).start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        self.state, self.started = "running", time.time()
+        interval = 1.0 / self.rate_per_s if self.rate_per_s > 0 else 0.0
+        for phrase in self.phrases:
+            if self._cancel.is_set():
+                break
+            if self._is_cached(phrase):
+                self.cached_before += 1
+                continue
+            # Cede a vez ao tráfego real: só sintetiza com a fila de admissão vazia.
+            while not self._is_idle() and not self._cancel.is_set():
+                self._cancel.wait(0.5)
+                self.waited_s += 0.5
+            t0 = time.monotonic()
+            try:
+                self._synth(phrase)
+                self.synthesized += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[tts] warmup falhou em {phrase[:60]!r}: {e}")
+            self._cancel.wait(max(0.0, interval - (time.monotonic() - t0)))
+        self.state = "cancelled" if self._cancel.is_set() else "done"
+        self.finished = time.time()
+
+    def stats(self) -> dict:
+        total = len(self.phrases)
+        done = self.cached_before + self.synthesized
+        return {
+            "state": self.state, "total": total, "cached_before": self.cached_before,
+            "synthesized": self.synthesized, "failed": self.failed,
+            "coverage_before": round(self.cached_before / total, 4) if total else 1.0,
+            "coverage": round(done / total, 4) if total else 1.0,
+            "waited_idle_s": round(self.waited_s, 1),
+            "elapsed_s": round((self.finished or time.time()) - self.started, 1) if self.started else 0.0,
+        }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pré-aquecimento do cache TTS")
+    ap.add_argument("--url", default="http://localhost:8001")
+    ap.add_argument("--phrases", help="arquivo com uma frase por linha")
+    ap.add_argument("--redis", action="store_true", help="minerar frases frequentes dos jobs no Redis")
+    ap.add_argument("--top", type=int, default=200)
+    ap.add_argument("--min-count", type=int, default=2)
+    ap.add_argument("--rate", type=float, default=1.0, help="frases por segundo")
+    ap.add_argument("--voice", default=None)
+    args = ap.parse_args(argv)
+    body = {"rate_per_s": args.rate, "voice": args.voice, "from_redis": args.redis,
+            "top": args.top, "min_count": args.min_count, "phrases": []}
+    if args.phrases:
+        with open(args.phrases, encoding="utf-8") as f:
+            body["phrases"] = [l.strip() for l in f if l.strip() and not l.startswith("#")]
+    req = urllib.request.Request(f"{args.url}/internal/tts/warmup", data=json.dumps(body).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as resp:
+        print(json.dumps(json.load(resp), ensure_ascii=False))
+    # Acompanha até terminar.
+    while True:
+        time.sleep(5)
+        with urllib.request.urlopen(f"{args.url}/internal/tts/warmup") as resp:
+            status = json.load(resp)
+        print(json.dumps(status, ensure_ascii=False))
+        if status.get("state") not in ("pending", "running"):
+            return 0 if not status.get("failed") else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
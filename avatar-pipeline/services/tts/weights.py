@@ -0,0 +1,34 @@
+
+# Pesos do modelo mapeados em memória a partir de um arquivo safetensors.
+# Na primeira carga o state_dict é gravado em TTS_WEIGHTS_DIR; depois disso os
+# parâmetros passam a apontar para o mmap (copy-on-write) do arquivo. Todos os
+# processos do nó (workers do uvicorn/gunicorn ou do ProcessEngine) compartilham
+# as mesmas páginas do page cache em vez de manter cópias privadas.
+import gc, os, re
+from pathlib import Path
+from services.tts.cache import atomic_write
+
+MMAP_WEIGHTS = os.getenv("TTS_MMAP_WEIGHTS", "1") == "1"
+WEIGHTS_DIR = Path(os.getenv("TTS_WEIGHTS_DIR", "/data/tts_models/safetensors"))
+
+def weights_path(name: str) -> Path:
+    return WEIGHTS_DIR / (re.sub(r"[^\w.-]+", "--", name) + ".safetensors")
+
+def share_weights(model, name: str) -> bool:
+    # True se os parâmetros agora vêm do mmap; em falha o modelo segue com os pesos privados.
+    from safetensors.torch import load_file, save_model
+    path = weights_path(name)
+    try:
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # save_model remove tensores compartilhados (pesos amarrados) antes de gravar.
+            atomic_write(path, lambda p: save_model(model, str(p)))
+        state = load_file(str(path))
+        # assign=True troca os tensores do módulo pelos do mmap em vez de copiar para eles;
+        # strict=False porque os pesos amarrados removidos na gravação continuam privados.
+        model.load_state_dict(state, strict=False, assign=True)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"[tts] pesos de {name} sem mmap: {e}")
+        return False
+    gc.collect()
+    return True
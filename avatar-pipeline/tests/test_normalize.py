@@ -0,0 +1,36 @@
+import pytest
+from services.tts.normalize import normalize_text
+
+CASES = [
+    # Datas: d/m sem ano só com contexto; o resto é fração.
+    ("Entrega dia 5/3.", "Entrega dia cinco de março."),
+    ("Válido até 05/03/2024", "Válido até cinco de março de dois mil e vinte e quatro"),
+    ("a partir de 1/10", "a partir de primeiro de outubro"),
+    ("1/2 xícara", "um meio xícara"),
+    ("em 2/3 dos casos", "em dois terços dos casos"),
+    ("caíram em 1/3", "caíram em um terço"),
+    ("entre 1/4 e 1/2", "entre um quarto e um meio"),
+    # Ordinais, inclusive acima de dez; "ºC" continua sendo temperatura.
+    ("1º lugar", "primeiro lugar"),
+    ("11º andar", "décimo primeiro andar"),
+    ("a 21ª turma", "a vigésima primeira turma"),
+    ("123º", "centésimo vigésimo terceiro"),
+    ("20ºC", "vinte graus Celsius"),
+    # Decimais só de zeros não são lidos.
+    ("2,00", "dois"),
+    ("1,05", "um vírgula zero cinco"),
+    ("1,0 kg", "um quilo"),
+    # Unidades de uma letra: coladas sempre; separadas só com contexto.
+    ("acima de 2,00 m", "acima de dois metros"),
+    ("acima de 2,00 m de altura", "acima de dois metros de altura"),
+    ("8 h da manhã", "oito horas da manhã"),
+    ("10A e 220V", "dez amperes e duzentos e vinte volts"),
+    ("10 A de corrente", "dez amperes de corrente"),
+    ("tensão de 220 V.", "tensão de duzentos e vinte volts."),
+    ("Capítulo 3 A seguir", "Capítulo três A seguir"),
+    ("50 %", "cinquenta por cento"),
+]
+
+@pytest.mark.parametrize("text,expected", CASES)
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
@@ -3,20 +3,32 @@ import sys, json, argparse, subprocess
 from pathlib import Path
 
 def run_ffmpeg(audio_path: str, out_mov: str, out_mp4: str):
+    # Áudio já em AAC (variante m4a do cache TTS) entra no MP4 sem re-encode.
+    audio_codec = ["-c:a", "copy"] if Path(audio_path).suffix == ".m4a" else ["-c:a", "aac", "-b:a", "192k"]
     cmd = [
         "ffmpeg", "-y",
         "-i", out_mov, "-i", audio_path,
         "-c:v", "libx264", "-crf", "18", "-preset", "medium",
-        "-c:a", "aac", "-b:a", "192k",
+        *audio_codec,
         "-shortest", out_mp4
     ]
     subprocess.check_call(cmd)
 
+def audio_duration_s(wav_path: str, default: float = 3.0) -> float:
+    # Duração vem do sidecar gerado pelo TTS (<wav>.json); sem ele, mantém o padrão.
+    sidecar = Path(wav_path).with_suffix(".json")
+    try:
+        meta = json.loads(sidecar.read_text())
+        return meta["audio"]["duration_ms"] / 1000
+    except (OSError, ValueError, KeyError, TypeError):
+        return default
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--project", required=True)
     ap.add_argument("--wav", required=True)
     ap.add_argument("--curves", required=True)
+    ap.add_argument("--audio", default=None, help="áudio para o mux (ex.: variante .m4a); padrão: --wav")
     ap.add_argument("--avatar_id", default="metahuman_01")
     ap.add_argument("--camera_preset", default="closeup_01")
     ap.add_argument("--lighting_preset", default="portrait_soft")
@@ -25,10 +37,11 @@ def main():
 
     out_dir = Path(args.out_dir); out_dir.mkdir(parents=True, exist_ok=True)
     out_mov = out_dir / "render.mov"
-    # Placeholder: cria vídeo preto 3s para smoke
-    subprocess.check_call(["ffmpeg", "-y", "-f", "lavfi", "-i", "color=c=black:s=1920x1080:r=30:d=3", str(out_mov)])
+    # Placeholder: cria vídeo preto com a duração do áudio para smoke
+    duration = audio_duration_s(args.wav)
+    subprocess.check_call(["ffmpeg", "-y", "-f", "lavfi", "-i", f"color=c=black:s=1920x1080:r=30:d={duration:.3f}", str(out_mov)])
     out_mp4 = out_dir / "output.mp4"
-    run_ffmpeg(args.wav, str(out_mov), str(out_mp4))
+    run_ffmpeg(args.audio or args.wav, str(out_mov), str(out_mp4))
     print(json.dumps({"output_mp4": str(out_mp4)}))
 
 if __name__ == "__main__":
@@ -9,6 +9,8 @@ r = redis.Redis(host=REDIS_HOST, port=6379, db=0, decode_responses=True)
 DATA_DIR = Path("/data")
 OUT_DIR = DATA_DIR / "out"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
+# Variante de áudio pedida ao TTS para o mux final (vazio = usa o WAV e re-encoda).
+RENDER_AUDIO_VARIANT = os.getenv("RENDER_AUDIO_VARIANT", "m4a")
 
 def save(job):
     r.set(f"job:{job['job_id']}", json.dumps(job))
@@ -41,14 +43,21 @@ def run():
             tts = requests.post("http://localhost:8001/internal/tts", json={
                 "text": job["params"]["text"],
                 "language": "pt-BR",
-                "speed": 1.0, "pitch": 0.0
+                "speed": 1.0, "pitch": 0.0,
+                "variant": RENDER_AUDIO_VARIANT or None,
+                "enable_fallback": job["params"].get("enable_fallback_tts", False)
             }).json()
+            job["tts_engine"] = tts.get("engine", "primary")
             step(job, "TTS", "DONE", ms=int((time.time()-t0)*1000), progress=25)
 
             t1 = time.time()
+            # Timings do TTS: o A2F monta as curvas por eles, sem analisar o áudio.
             a2f = requests.post("http://localhost:8002/internal/a2f", json={
-                "wav_path": tts["wav_path"], "format": "json"
+                "wav_path": tts["wav_path"], "format": "json",
+                "phonemes": tts.get("phonemes"), "words": tts.get("words"),
+                "duration_ms": tts.get("audio", {}).get("duration_ms")
             }).json()
+            job["a2f_cache_hit"] = a2f.get("cache_hit", False)
             step(job, "A2F", "DONE", ms=int((time.time()-t1)*1000), progress=50)
 
             t2 = time.time()
@@ -59,6 +68,7 @@ def run():
               "--project", "/proj/AvatarPipeline.uproject",
               "--wav", tts["wav_path"],
               "--curves", a2f["curves_path"],
+              "--audio", tts.get("variant_path") or tts["wav_path"],
               "--avatar_id", job["params"]["avatar_id"],
               "--camera_preset", job["params"]["camera_preset"],
               "--lighting_preset", job["params"]["lighting_preset"],